@@ -0,0 +1,84 @@
+import os
+import json
+import logging
+from contextlib import contextmanager
+
+# Per-stage warehouse policy, e.g.
+#   {"fact": {"warehouse": "snowpark_etl_wh", "size": "large", "after": "suspend"}}
+# warehouse defaults to the session's current warehouse, size to its current size,
+# after is "restore" (put size/warehouse back) or "suspend" (restore, then suspend).
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compute_policy.json")
+
+def load_policy(path: str = None) -> dict:
+    path = path or os.getenv("COMPUTE_POLICY", DEFAULT_POLICY_PATH)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _unquote(name: str) -> str:
+    return name.strip('"') if name else name
+
+def _warehouse_size(session, warehouse: str) -> str:
+    # LIKE treats "_" as a wildcard, so pick the row with exactly this name
+    for row in session.sql(f"show warehouses like '{warehouse}'").collect():
+        r = row.as_dict()
+        if r["name"].upper() == warehouse.upper():
+            return r["size"]
+    return None
+
+def _normalize_size(size: str) -> str:
+    # SHOW WAREHOUSES reports "X-Small", ALTER accepts "XSMALL"
+    return size.replace("-", "").replace("_", "").upper() if size else size
+
+def _post_stage(stage: str, description: str, action) -> None:
+    logging.info(f"[{stage}] {description}")
+    try:
+        action()
+    except Exception as e:
+        logging.warning(f"[{stage}] Failed to apply post-stage compute policy ({description}): {e}")
+
+@contextmanager
+def stage_compute(session, stage: str, policy: dict = None):
+    """Run the enclosed block on the warehouse and size configured for this stage."""
+    policy = load_policy() if policy is None else policy
+    stage_policy = policy.get(stage)
+    if not stage_policy:
+        yield
+        return
+
+    previous_warehouse = _unquote(session.get_current_warehouse())
+    warehouse = stage_policy.get("warehouse") or previous_warehouse
+    if not warehouse:
+        logging.warning(f"[{stage}] No warehouse in the session or the policy, running the stage unchanged")
+        yield
+        return
+    size = _normalize_size(stage_policy.get("size"))
+    after = stage_policy.get("after", "restore")
+
+    switched = warehouse.upper() != (previous_warehouse or "").upper()
+    previous_size = None
+    try:
+        if switched:
+            logging.info(f"[{stage}] Switching warehouse {previous_warehouse} -> {warehouse}")
+            session.use_warehouse(warehouse)
+
+        if size:
+            current_size = _warehouse_size(session, warehouse)
+            if _normalize_size(current_size) != size:
+                logging.info(f"[{stage}] Resizing {warehouse} {current_size} -> {size}")
+                session.sql(f"alter warehouse {warehouse} set warehouse_size = {size} wait_for_completion = true").collect()
+                previous_size = _normalize_size(current_size)
+        yield
+    finally:
+        # each post-stage action runs on its own, e.g. an already suspended warehouse
+        # must neither fail the stage that just finished nor keep the session on it
+        if previous_size:
+            _post_stage(stage, f"Restoring {warehouse} size to {previous_size}",
+                        lambda: session.sql(f"alter warehouse {warehouse} set warehouse_size = {previous_size}").collect())
+        if after == "suspend":
+            _post_stage(stage, f"Suspending {warehouse}",
+                        lambda: session.sql(f"alter warehouse if exists {warehouse} suspend").collect())
+        if switched and previous_warehouse:
+            _post_stage(stage, f"Switching back to warehouse {previous_warehouse}",
+                        lambda: session.use_warehouse(previous_warehouse))
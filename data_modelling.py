@@ -1,15 +1,27 @@
+import os
 import sys
 import logging
-import pandas as pd
-
-from snowflake.snowpark import Session, DataFrame, CaseExpr
-from snowflake.snowpark.functions import col,lit,row_number, rank, split,cast, when, expr,min, max,sql_expr, current_timestamp, concat, lit, substring, date_part
-from snowflake.snowpark.types import StructType, StringType, StructField, StringType,LongType,DecimalType,DateType,TimestampType
-from snowflake.snowpark import Window
+import argparse
+import datetime
+import threading
+
+from snowflake.snowpark import Session, DataFrame, Window
+from snowflake.snowpark.functions import col, lit, split, cast, expr, min, max, sql_expr, current_timestamp, concat, substring, date_part, row_number
+from snowflake.snowpark.types import StringType
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sales_aggregates import refresh_sales_aggregates, ensure_aggregate_streams
+from compute_policy import stage_compute
+from surrogate_keys import KEY_STRATEGY, use_hash_keys, key_sql, hash_key_sql, date_key, date_key_sql
 
 # initiate logging at info level
 logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
 
+# ORDER_ATTR_DIM=Y loads payment and promo code attributes into the order_attr_dim junk
+# dimension instead of payment_dim/promo_code_dim (which become views over it)
+USE_ORDER_ATTR_DIM = os.getenv("ORDER_ATTR_DIM", "N").upper() == "Y"
+# natural key of an order_attr_dim row, in hash key order (order_attr_dim_migration.sql hashes the same)
+ORDER_ATTR_COLUMNS = ["payment_method", "payment_provider", "promotion_code", "country", "region"]
+
 # snowpark session
 def get_snowpark_session() -> Session:
     connection_parameters = {
@@ -26,7 +38,7 @@ def get_snowpark_session() -> Session:
 
 # This is a simple dim table having nation and region.
 # fields are 'Country','Region'
-def create_region_dim(all_sales_df, session) -> None:
+def create_region_dim(all_sales_df, session) -> bool:
     print("\n=== Creating Region Dimension Table ===")
     try:
         # Step 1: Get distinct region-country pairs
@@ -41,17 +53,20 @@ def create_region_dim(all_sales_df, session) -> None:
         )
 
         # Step 3: Build REGION_ID_PK
-        region_dim_df = region_dim_df.with_column(
-            "REGION_ID_PK",
-            concat(
-                lit("REG_"),
-                substring(col("REGION"), -2, 2),
-                lit("_"),
-                col("COUNTRY"),
-                lit("_"),
-                timestamp_str
+        if use_hash_keys():
+            region_dim_df = region_dim_df.with_column("REGION_ID_PK", sql_expr(f"to_varchar({hash_key_sql('COUNTRY', 'REGION')})"))
+        else:
+            region_dim_df = region_dim_df.with_column(
+                "REGION_ID_PK",
+                concat(
+                    lit("REG_"),
+                    substring(col("REGION"), -2, 2),
+                    lit("_"),
+                    col("COUNTRY"),
+                    lit("_"),
+                    timestamp_str
+                )
             )
-        )
 
         region_dim_df = region_dim_df.selectExpr("REGION_ID_PK", "REGION", "COUNTRY", "isActive")
         print("\n▶ New candidate records for Region dimension:")
@@ -81,10 +96,12 @@ def create_region_dim(all_sales_df, session) -> None:
         else:
             print("\n○ No new records to insert into Region dimension")
             
+        return True
     except Exception as e:
         print(f"\n× Failed to create/update Region dimension: {str(e)}")
+        return False
 
-def create_product_dim(all_sales_df, session) -> None:
+def create_product_dim(all_sales_df, session) -> bool:
     print("\n=== Creating Product Dimension Table ===")
     try:
         product_dim_df = all_sales_df.with_column("Brand", split(col('MOBILE_KEY'), lit('/'))[0]) \
@@ -125,7 +142,7 @@ def create_product_dim(all_sales_df, session) -> None:
             product_dim_df.show()
 
         product_dim_df = product_dim_df.selectExpr(
-            "sales_dwh.consumption.product_dim_seq.nextval as product_id_pk",
+            f"{key_sql('sales_dwh.consumption.product_dim_seq', 'mobile_key')} as product_id_pk",
             "mobile_key", "Brand", "Model", "Color", "Memory", "isActive"
         )
 
@@ -135,10 +152,12 @@ def create_product_dim(all_sales_df, session) -> None:
             print(f"\n✓ Successfully inserted {insert_cnt} new records into Product dimension")
         else:
             print("\n○ No new records to insert into Product dimension")
+        return True
     except Exception as e:
         print(f"\n× Failed to create/update Product dimension: {str(e)}")
+        return False
 
-def create_promocode_dim(all_sales_df,session)-> None:
+def create_promocode_dim(all_sales_df,session) -> bool:
     print("\n=== Creating Promo Code Dimension Table ===")
     try:
         promo_code_dim_df = all_sales_df.with_column( "promotion_code", expr("case when promotion_code is null then 'NA' else promotion_code end"))
@@ -150,7 +169,7 @@ def create_promocode_dim(all_sales_df,session)-> None:
 
         promo_code_dim_df = promo_code_dim_df.join(existing_promo_code_dim_df,["promotion_code", "country", "region"],join_type='leftanti')
 
-        promo_code_dim_df = promo_code_dim_df.selectExpr("sales_dwh.consumption.promo_code_dim_seq.nextval as promo_code_id_pk","promotion_code", "country","region","isActive") 
+        promo_code_dim_df = promo_code_dim_df.selectExpr(f"{key_sql('sales_dwh.consumption.promo_code_dim_seq', 'promotion_code', 'country', 'region')} as promo_code_id_pk","promotion_code", "country","region","isActive") 
 
 
         intsert_cnt = int(promo_code_dim_df.count())
@@ -159,10 +178,12 @@ def create_promocode_dim(all_sales_df,session)-> None:
             print(f"✓ Successfully inserted {intsert_cnt} new records into Promo Code dimension")
         else:
             print("× No new records to insert into Promo Code dimension")
+        return True
     except Exception as e:
         print(f"× Failed to create/update Promo Code dimension: {str(e)}")
+        return False
     
-def create_customer_dim(all_sales_df, session) -> None:
+def create_customer_dim(all_sales_df, session) -> bool:
     print("\n=== Creating Customer Dimension Table ===")
     try:
         customer_dim_df = all_sales_df.groupBy(col("COUNTRY"),col("REGION"),col("CUSTOMER_NAME"),col("CONCTACT_NO"),col("SHIPPING_ADDRESS")).count()
@@ -173,7 +194,7 @@ def create_customer_dim(all_sales_df, session) -> None:
 
         customer_dim_df = customer_dim_df.join(existing_customer_dim_df,["customer_name","conctact_no","shipping_address","country", "region"],join_type='leftanti')
 
-        customer_dim_df = customer_dim_df.selectExpr("sales_dwh.consumption.customer_dim_seq.nextval as customer_id_pk","customer_name", "conctact_no","shipping_address","country","region", "isActive") 
+        customer_dim_df = customer_dim_df.selectExpr(f"{key_sql('sales_dwh.consumption.customer_dim_seq', 'customer_name', 'conctact_no', 'shipping_address', 'country', 'region')} as customer_id_pk","customer_name", "conctact_no","shipping_address","country","region", "isActive") 
 
         intsert_cnt = int(customer_dim_df.count())
         if intsert_cnt>0:
@@ -181,10 +202,12 @@ def create_customer_dim(all_sales_df, session) -> None:
             print(f"✓ Successfully inserted {intsert_cnt} new records into Customer dimension")
         else:
             print("× No new records to insert into Customer dimension")
+        return True
     except Exception as e:
         print(f"× Failed to create/update Customer dimension: {str(e)}")
+        return False
     
-def create_payment_dim(all_sales_df, session) -> None:
+def create_payment_dim(all_sales_df, session) -> bool:
     print("\n=== Creating Payment Dimension Table ===")
     try:
         payment_dim_df = all_sales_df.groupBy(col("COUNTRY"),col("REGION"),col("payment_method"),col("payment_provider")).count()
@@ -196,7 +219,7 @@ def create_payment_dim(all_sales_df, session) -> None:
                                              ["payment_method","payment_provider","country", "region"],
                                              join_type='leftanti')
 
-        payment_dim_df = payment_dim_df.selectExpr("sales_dwh.consumption.payment_dim_seq.nextval as payment_id_pk","payment_method", "payment_provider","country","region", "isActive") 
+        payment_dim_df = payment_dim_df.selectExpr(f"{key_sql('sales_dwh.consumption.payment_dim_seq', 'payment_method', 'payment_provider', 'country', 'region')} as payment_id_pk","payment_method", "payment_provider","country","region", "isActive") 
 
 
         intsert_cnt = int(payment_dim_df.count())
@@ -205,14 +228,50 @@ def create_payment_dim(all_sales_df, session) -> None:
             print(f"✓ Successfully inserted {intsert_cnt} new records into Payment dimension")
         else:
             print("× No new records to insert into Payment dimension")
+        return True
     except Exception as e:
         print(f"× Failed to create/update Payment dimension: {str(e)}")
+        return False
+
+# Junk dimension over the full payment/promo attribute tuple, replaces the
+# payment and promo code dimensions with a single load and a single fact join.
+def create_order_attr_dim(all_sales_df, session) -> bool:
+    print("\n=== Creating Order Attributes Dimension Table ===")
+    try:
+        order_attr_dim_df = all_sales_df.with_column( "promotion_code", expr("case when promotion_code is null then 'NA' else promotion_code end"))
+        order_attr_dim_df = order_attr_dim_df.groupBy(*[col(c) for c in ORDER_ATTR_COLUMNS]).count()
+        order_attr_dim_df = order_attr_dim_df.with_column("isActive",lit('Y'))
+
+        existing_order_attr_dim_df = session.sql("select payment_method, payment_provider, promotion_code, country, region from sales_dwh.consumption.order_attr_dim")
+
+        order_attr_dim_df = order_attr_dim_df.join(existing_order_attr_dim_df, ORDER_ATTR_COLUMNS, join_type='leftanti')
+
+        order_attr_dim_df = order_attr_dim_df.selectExpr(f"{key_sql('sales_dwh.consumption.order_attr_dim_seq', *ORDER_ATTR_COLUMNS)} as order_attr_id_pk",
+                                                         "payment_method", "payment_provider", "promotion_code", "country", "region", "isActive")
+
+        intsert_cnt = int(order_attr_dim_df.count())
+        if intsert_cnt>0:
+            order_attr_dim_df.write.save_as_table("sales_dwh.consumption.order_attr_dim",mode="append")
+            print(f"✓ Successfully inserted {intsert_cnt} new records into Order Attributes dimension")
+        else:
+            print("× No new records to insert into Order Attributes dimension")
+        return True
+    except Exception as e:
+        print(f"× Failed to create/update Order Attributes dimension: {str(e)}")
+        return False
+
+def create_date_dim(all_sales_df, session, date_range=None) -> bool:
+    # pandas is only needed here, keep it off the import path of the other steps
+    import pandas as pd
 
-def create_date_dim(all_sales_df, session) -> None:
     print("\n=== Creating Date Dimension Table ===")
     try:
-        start_date = all_sales_df.select(min("order_dt").alias("min_order_dt")).collect()[0].as_dict()['MIN_ORDER_DT']
-        end_date = all_sales_df.select(max("order_dt").alias("max_order_dt")).collect()[0].as_dict()['MAX_ORDER_DT']
+        if date_range:
+            # order date range from order_date_span, no second scan of the curated orders
+            start_date, end_date = date_range
+        else:
+            start_date = all_sales_df.select(min("order_dt").alias("min_order_dt")).collect()[0].as_dict()['MIN_ORDER_DT']
+            end_date = all_sales_df.select(max("order_dt").alias("max_order_dt")).collect()[0].as_dict()['MAX_ORDER_DT']
         date_range = pd.date_range(start=start_date, end=end_date, freq='D')
         #print(date_range)
         date_dim = pd.DataFrame()
@@ -236,8 +295,9 @@ def create_date_dim(all_sales_df, session) -> None:
         existing_date_dim_df = session.sql("select order_dt from sales_dwh.consumption.date_dim ") 
         date_dim_df = date_dim_df.join(existing_date_dim_df,existing_date_dim_df['order_dt']==date_dim_df['"order_dt"'],join_type='leftanti')
 
-        date_dim_df = date_dim_df.selectExpr(' \
-                                           sales_dwh.consumption.date_dim_seq.nextval, \
+        date_key_expr = date_key_sql('"order_dt"') if use_hash_keys() else "sales_dwh.consumption.date_dim_seq.nextval"
+        date_dim_df = date_dim_df.selectExpr(f' \
+                                           {date_key_expr}, \
                                            "order_dt" as order_dt, \
                                            "Year" as order_year, \
                                            "Month" as order_month, \
@@ -256,10 +316,292 @@ def create_date_dim(all_sales_df, session) -> None:
             print(f"✓ Successfully inserted {intsert_cnt} new records into Date dimension")
         else:
             print("× No new records to insert into Date dimension")
+        return True
     except Exception as e:
         print(f"× Failed to create/update Date dimension: {str(e)}")
+        return False
+
+# Order date range for the date dimension and the fact chunks, from the curated tables:
+# their MIN/MAX is served from table metadata, and unlike the local partition index it
+# covers files that were cleaned from the landing dirs or landed on another host.
+def order_date_span(session):
+    dates = session.sql("""
+        select min(min_order_dt) as min_order_dt, max(max_order_dt) as max_order_dt from (
+            select min(order_dt) as min_order_dt, max(order_dt) as max_order_dt from sales_dwh.curated.in_sales_order
+            union all
+            select min(order_dt), max(order_dt) from sales_dwh.curated.us_sales_order
+            union all
+            select min(order_dt), max(order_dt) from sales_dwh.curated.fr_sales_order)
+    """).collect()[0].as_dict()
+    if not dates['MIN_ORDER_DT']:
+        return None
+    return str(dates['MIN_ORDER_DT']), str(dates['MAX_ORDER_DT'])
+
+# The consumption layer has to be built with one key strategy: the dimension anti-joins
+# match on natural keys, so after a switch the existing rows keep their old keys and
+# new fact rows would reference keys no dimension has. product_dim tells which
+# strategy built it (a sequence key never equals the hash of the mobile key).
+def check_key_strategy(session) -> None:
+    counts = session.sql(f"""
+        select count(*) as total, count_if(product_id_pk = {hash_key_sql('mobile_key')}) as hashed
+        from sales_dwh.consumption.product_dim
+    """).collect()[0].as_dict()
+    expected_hashed = counts['TOTAL'] if use_hash_keys() else 0
+    if counts['HASHED'] != expected_hashed:
+        raise RuntimeError(f"the consumption layer was built with a different key strategy than KEY_STRATEGY={KEY_STRATEGY}, "
+                           "rebuild it first (see Surrogate Keys in the README)")
+
+# ORDER_ATTR_DIM has to match the tables. After order_attr_dim_migration.sql payment_dim and
+# promo_code_dim are views over order_attr_dim, with one row per promo code: loading into
+# them fails, and joining the payment view on its attributes would multiply fact rows.
+def check_order_attr_mode(session) -> None:
+    rows = session.sql("""
+        select table_type from sales_dwh.information_schema.tables
+        where table_schema = 'CONSUMPTION' and table_name = 'PAYMENT_DIM'
+    """).collect()
+    migrated = bool(rows) and rows[0].as_dict()['TABLE_TYPE'] == 'VIEW'
+    if migrated and not USE_ORDER_ATTR_DIM:
+        raise RuntimeError("payment_dim is a view over order_attr_dim, set ORDER_ATTR_DIM=Y")
+    if USE_ORDER_ATTR_DIM and not migrated:
+        raise RuntimeError("ORDER_ATTR_DIM=Y but payment_dim is not a view yet, run order_attr_dim_migration.sql first")
+
+def load_all_sales(session) -> DataFrame:
+    in_sales_df = session.sql("select * from sales_dwh.curated.in_sales_order")
+    us_sales_df = session.sql("select * from sales_dwh.curated.us_sales_order")
+    fr_sales_df = session.sql("select * from sales_dwh.curated.fr_sales_order")
+    return in_sales_df.union(us_sales_df).union(fr_sales_df)
+
+# With hash keys every foreign key is computed from the sales row's own natural key
+# columns, so no dimension lookups are needed; re-runs skip orders already loaded.
+def _hash_key_sales_fact_df(all_sales_df, session) -> DataFrame:
+    all_sales_df = all_sales_df.with_column( "promotion_code", expr("case when promotion_code is null then 'NA' else promotion_code end"))
+    if USE_ORDER_ATTR_DIM:
+        # both foreign keys point at the order_attr_dim row behind the compatibility views
+        payment_key = promo_code_key = hash_key_sql(*ORDER_ATTR_COLUMNS)
+    else:
+        payment_key = hash_key_sql('payment_method', 'payment_provider', 'country', 'region')
+        promo_code_key = hash_key_sql('promotion_code', 'country', 'region')
+    all_sales_df = all_sales_df.selectExpr(f"{hash_key_sql('country', 'order_id')} as order_id_pk",
+                                           "order_id as order_code",
+                                           f"{date_key_sql('order_dt')} as date_id_fk",
+                                           f"to_varchar({hash_key_sql('country', 'region')}) as region_id_fk",
+                                           f"{hash_key_sql('customer_name', 'conctact_no', 'shipping_address', 'country', 'region')} as customer_id_fk",
+                                           f"{payment_key} as payment_id_fk",
+                                           f"{hash_key_sql('mobile_key')} as product_id_fk",
+                                           f"{promo_code_key} as promo_code_id_fk",
+                                           "order_quantity",
+                                           "local_total_order_amt",
+                                           "local_tax_amt",
+                                           "exhchange_rate",
+                                           "us_total_order_amt",
+                                           "usd_tax_amt",
+                                           "sales_order_key")
+    # the same order can be curated more than once (e.g. a reloaded file), keep its latest row
+    # so the order key stays unique; the anti-join only guards against earlier loads
+    latest_order = Window.partition_by(col("order_id_pk")).order_by(col("sales_order_key").desc())
+    all_sales_df = all_sales_df.with_column("order_rank", row_number().over(latest_order)).filter(col("order_rank") == 1).drop("order_rank", "sales_order_key")
+    existing_fact_df = session.sql("select order_id_pk from sales_dwh.consumption.sales_fact")
+    return all_sales_df.join(existing_fact_df, ["order_id_pk"], join_type='leftanti')
+
+# resolve the dimension keys and project the sales fact columns
+def sales_fact_df(all_sales_df, session) -> DataFrame:
+    if use_hash_keys():
+        return _hash_key_sales_fact_df(all_sales_df, session)
+
+    date_dim_df = session.sql("select date_id_pk, order_dt from sales_dwh.consumption.date_dim")
+    customer_dim_df = session.sql("select customer_id_pk, customer_name, country, region from sales_dwh.consumption.CUSTOMER_DIM")
+    product_dim_df = session.sql("select product_id_pk, mobile_key from sales_dwh.consumption.PRODUCT_DIM")
+    if USE_ORDER_ATTR_DIM:
+        # one junk dimension row gives both the payment and the promo code key
+        order_attr_dim_df = session.sql("select order_attr_id_pk as payment_id_pk, order_attr_id_pk as promo_code_id_pk, payment_method, payment_provider, promotion_code, country, region from sales_dwh.consumption.ORDER_ATTR_DIM")
+    else:
+        payment_dim_df = session.sql("select payment_id_pk, payment_method, payment_provider, country, region from sales_dwh.consumption.PAYMENT_DIM")
+        promo_code_dim_df = session.sql("select promo_code_id_pk,promotion_code,country, region from sales_dwh.consumption.PROMO_CODE_DIM")
+    region_dim_df = session.sql("select region_id_pk,country, region from sales_dwh.consumption.REGION_DIM")
+
+    all_sales_df = all_sales_df.with_column( "promotion_code", expr("case when promotion_code is null then 'NA' else promotion_code end"))
+    all_sales_df = all_sales_df.join(date_dim_df, ["order_dt"],join_type='inner')
+    all_sales_df = all_sales_df.join(customer_dim_df, ["customer_name","region","country"],join_type='inner')
+    if USE_ORDER_ATTR_DIM:
+        all_sales_df = all_sales_df.join(order_attr_dim_df, ORDER_ATTR_COLUMNS,join_type='inner')
+    else:
+        all_sales_df = all_sales_df.join(payment_dim_df, ["payment_method", "payment_provider", "country", "region"],join_type='inner')
+        all_sales_df = all_sales_df.join(promo_code_dim_df, ["promotion_code","country", "region"],join_type='inner')
+    #all_sales_df = all_sales_df.join(product_dim_df, ["brand","model","color","Memory"],join_type='inner')
+    all_sales_df = all_sales_df.join(product_dim_df, ["mobile_key"],join_type='inner')
+    all_sales_df = all_sales_df.join(region_dim_df, ["country", "region"],join_type='inner')
+    all_sales_df = all_sales_df.selectExpr("sales_dwh.consumption.sales_fact_seq.nextval as order_id_pk, \
+                                           order_id as order_code,                               \
+                                           date_id_pk as date_id_fk,          \
+                                           region_id_pk as region_id_fk,            \
+                                           customer_id_pk as customer_id_fk,        \
+                                           payment_id_pk as payment_id_fk,          \
+                                           product_id_pk as product_id_fk,          \
+                                           promo_code_id_pk as promo_code_id_fk,    \
+                                           order_quantity,                          \
+                                           local_total_order_amt,                   \
+                                           local_tax_amt,                           \
+                                           exhchange_rate,                          \
+                                           us_total_order_amt,                      \
+                                           usd_tax_amt                              \
+                                           ")
+    return all_sales_df
+
+def create_sales_fact(all_sales_df, session) -> bool:
+    print("\n=== Creating Sales Fact Table ===")
+    try:
+        sales_fact_df(all_sales_df, session).write.save_as_table("sales_dwh.consumption.sales_fact",mode="append")
+        print("✓ Successfully created Sales Fact table")
+        return True
+    except Exception as e:
+        print(f"× Failed to create Sales Fact table: {str(e)}")
+        return False
+
+CHUNK_EPOCH = datetime.date(1970, 1, 1)
+
+# Chunks start at multiples of chunk_days from a fixed epoch, so their boundaries don't
+# move when the order date range grows and the chunk log keeps matching earlier runs.
+# The first and last chunk may reach past the range.
+def _date_chunks(start_date, end_date, chunk_days: int) -> list:
+    if chunk_days < 1:
+        raise ValueError(f"chunk_days must be positive, got {chunk_days}")
+    start_date = datetime.date.fromisoformat(str(start_date))
+    end_date = datetime.date.fromisoformat(str(end_date))
+    chunk_start = start_date - datetime.timedelta(days=(start_date - CHUNK_EPOCH).days % chunk_days)
+    chunks = []
+    while chunk_start <= end_date:
+        chunk_end = chunk_start + datetime.timedelta(days=chunk_days - 1)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+    return chunks
+
+# "<rows>:<max sales_order_key>" of the curated orders in each chunk; late arriving
+# or reloaded rows change it, so the chunk is built again on the next run.
+def _chunk_fingerprints(session, chunks) -> dict:
+    chunk_of = {}
+    for chunk in chunks:
+        day = chunk[0]
+        while day <= chunk[1]:
+            chunk_of[day] = chunk
+            day += datetime.timedelta(days=1)
+
+    totals = {chunk: [0, None] for chunk in chunks}
+    by_date = load_all_sales(session).group_by("order_dt").agg(sql_expr("count(*)").alias("row_cnt"), max("sales_order_key").alias("max_key"))
+    for row in by_date.collect():
+        r = row.as_dict()
+        chunk = chunk_of.get(r['ORDER_DT'])
+        if chunk is None:
+            continue
+        total = totals[chunk]
+        total[0] += r['ROW_CNT']
+        if total[1] is None or r['MAX_KEY'] > total[1]:
+            total[1] = r['MAX_KEY']
+    return {chunk: f"{rows}:{max_key}" for chunk, (rows, max_key) in totals.items()}
+
+def _chunk_predicate(chunk_start, chunk_end) -> str:
+    if use_hash_keys():
+        # yyyymmdd keys, no lookup in date_dim (which may be loading at the same time)
+        return f"date_id_fk between {date_key(chunk_start)} and {date_key(chunk_end)}"
+    return f"date_id_fk in (select date_id_pk from sales_dwh.consumption.date_dim where order_dt between '{chunk_start}' and '{chunk_end}')"
+
+# Insert the fact rows of one order_dt range in a single transaction: the rows are
+# loaded and the chunk is recorded as done, or nothing happens. The range was
+# emptied up front by create_sales_fact_chunked.
+def _build_fact_chunk(session, chunk_start, chunk_end, fingerprint: str) -> int:
+    chunk_df = load_all_sales(session).filter((col("order_dt") >= lit(chunk_start)) & (col("order_dt") <= lit(chunk_end)))
+    session.sql("begin").collect()
+    try:
+        sales_fact_df(chunk_df, session).write.save_as_table("sales_dwh.consumption.sales_fact",mode="append")
+        row_cnt = session.sql(f"select count(*) as cnt from sales_dwh.consumption.sales_fact where {_chunk_predicate(chunk_start, chunk_end)}").collect()[0].as_dict()['CNT']
+        session.sql(f"""insert into sales_dwh.audit.sales_fact_chunk_log (chunk_start, chunk_end, row_count, source_fingerprint, completed_at)
+                        select '{chunk_start}', '{chunk_end}', {row_cnt}, '{fingerprint}', current_timestamp()""").collect()
+        session.sql("commit").collect()
+        return row_cnt
+    except Exception:
+        session.sql("rollback").collect()
+        raise
+
+# returns (ok, replaced chunks): chunks replace existing fact rows, which the append-only
+# aggregate streams don't see, so the caller rebuilds the aggregates when any were replaced
+def create_sales_fact_chunked(session, date_range, chunk_days: int, workers: int = 1, reset: bool = False) -> tuple:
+    print(f"\n=== Creating Sales Fact Table in {chunk_days} day chunks ===")
+    replaced = 0
+    try:
+        session.sql("""create table if not exists sales_dwh.audit.sales_fact_chunk_log (
+                            chunk_start date, chunk_end date, row_count number(38,0), source_fingerprint text, completed_at timestamp_ntz(9))""").collect()
+        session.sql("alter table sales_dwh.audit.sales_fact_chunk_log add column if not exists source_fingerprint text").collect()
+        if reset:
+            session.sql("truncate table sales_dwh.audit.sales_fact_chunk_log").collect()
+            print("✓ Cleared completed chunks, rebuilding every chunk")
+
+        date_range = date_range or order_date_span(session)
+        if not date_range:
+            print("○ No curated sales orders, nothing to build")
+            return True, replaced
+
+        # a chunk is done when its latest build saw the same curated rows as there are now
+        logged = {(str(r['CHUNK_START']), str(r['CHUNK_END'])): r['SOURCE_FINGERPRINT'] for r in
+                  (row.as_dict() for row in session.sql("""
+                        select chunk_start, chunk_end, source_fingerprint from sales_dwh.audit.sales_fact_chunk_log
+                        qualify row_number() over (partition by chunk_start, chunk_end order by completed_at desc) = 1
+                  """).collect())}
+        all_chunks = _date_chunks(*date_range, chunk_days)
+        fingerprints = _chunk_fingerprints(session, all_chunks)
+        chunks = [c for c in all_chunks if logged.get((str(c[0]), str(c[1]))) != fingerprints[c]]
+        print(f"▶ {len(chunks)} chunk(s) to build, {len(all_chunks) - len(chunks)} unchanged since their last build")
+        if not chunks:
+            return True, replaced
+
+        # Snowflake serializes DELETEs on a table, so the chunks are emptied by one
+        # statement up front and the chunk transactions only insert, side by side.
+        # A chunk that fails stays empty and unlogged, the next run builds it again.
+        session.sql(f"delete from sales_dwh.consumption.sales_fact where {' or '.join(_chunk_predicate(*c) for c in chunks)}").collect()
+        replaced = len(chunks)
+
+        # each parallel worker needs its own session for its own transactions; it is
+        # opened on the worker's first chunk and reused for the chunks that follow
+        worker = threading.local()
+        worker_sessions = []
+
+        def chunk_session():
+            if workers == 1:
+                return session
+            if not hasattr(worker, "session"):
+                worker.session = get_snowpark_session()
+                worker_sessions.append(worker.session)
+                # stay on the warehouse the fact compute policy selected
+                worker.session.use_warehouse(session.get_current_warehouse())
+            return worker.session
+
+        def run_chunk(chunk):
+            row_cnt = _build_fact_chunk(chunk_session(), *chunk, fingerprints[chunk])
+            print(f"✓ Built sales fact chunk {chunk[0]} .. {chunk[1]} ({row_cnt} rows)")
+
+        failed = 0
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(run_chunk, chunk): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed += 1
+                        chunk = futures[future]
+                        print(f"× Failed to build sales fact chunk {chunk[0]} .. {chunk[1]}: {str(e)}")
+        finally:
+            for worker_session in worker_sessions:
+                worker_session.close()
+        if failed:
+            print(f"× {failed} chunk(s) failed, rerun to resume from the missing chunks")
+            return False, replaced
+        print("✓ Successfully created Sales Fact table")
+        return True, replaced
+    except Exception as e:
+        print(f"× Failed to create Sales Fact table: {str(e)}")
+        return False, replaced
 
-def main():
+# returns False when any step failed, callers tracking processed files rely on it
+def main(rebuild_aggregates: bool = False, fact_chunk_days: int = None, fact_chunk_workers: int = 1, reset_fact_chunks: bool = False) -> bool:
     print("\n=== Starting Data Modeling Process ===")
     try:
         #get the session object and get dataframe
@@ -271,61 +613,106 @@ def main():
         print("✓ Successfully created/verified sales_fact_seq")
 
         print("\n=== Loading Source Data ===")
-        in_sales_df = session.sql("select * from sales_dwh.curated.in_sales_order")
-        us_sales_df = session.sql("select * from sales_dwh.curated.us_sales_order")
-        fr_sales_df = session.sql("select * from sales_dwh.curated.fr_sales_order")
+        all_sales_df = load_all_sales(session)
         print("✓ Successfully loaded source data")
 
-        all_sales_df = in_sales_df.union(us_sales_df).union(fr_sales_df)
-
-        # Create dimensions
-        create_date_dim(all_sales_df,session)
-        create_region_dim(all_sales_df,session)
-        create_product_dim(all_sales_df,session)
-        create_promocode_dim(all_sales_df,session)
-        create_customer_dim(all_sales_df,session)
-        create_payment_dim(all_sales_df,session)
-
-        print("\n=== Creating Sales Fact Table ===")
-        try:
-            date_dim_df = session.sql("select date_id_pk, order_dt from sales_dwh.consumption.date_dim")
-            customer_dim_df = session.sql("select customer_id_pk, customer_name, country, region from sales_dwh.consumption.CUSTOMER_DIM")
-            payment_dim_df = session.sql("select payment_id_pk, payment_method, payment_provider, country, region from sales_dwh.consumption.PAYMENT_DIM")
-            product_dim_df = session.sql("select product_id_pk, mobile_key from sales_dwh.consumption.PRODUCT_DIM")
-            promo_code_dim_df = session.sql("select promo_code_id_pk,promotion_code,country, region from sales_dwh.consumption.PROMO_CODE_DIM")
-            region_dim_df = session.sql("select region_id_pk,country, region from sales_dwh.consumption.REGION_DIM")
-
-            all_sales_df = all_sales_df.with_column( "promotion_code", expr("case when promotion_code is null then 'NA' else promotion_code end"))
-            all_sales_df = all_sales_df.join(date_dim_df, ["order_dt"],join_type='inner')
-            all_sales_df = all_sales_df.join(customer_dim_df, ["customer_name","region","country"],join_type='inner')
-            all_sales_df = all_sales_df.join(payment_dim_df, ["payment_method", "payment_provider", "country", "region"],join_type='inner')
-            #all_sales_df = all_sales_df.join(product_dim_df, ["brand","model","color","Memory"],join_type='inner')
-            all_sales_df = all_sales_df.join(product_dim_df, ["mobile_key"],join_type='inner')
-            all_sales_df = all_sales_df.join(promo_code_dim_df, ["promotion_code","country", "region"],join_type='inner')
-            all_sales_df = all_sales_df.join(region_dim_df, ["country", "region"],join_type='inner')
-            all_sales_df = all_sales_df.selectExpr("sales_dwh.consumption.sales_fact_seq.nextval as order_id_pk, \
-                                                   order_id as order_code,                               \
-                                                   date_id_pk as date_id_fk,          \
-                                                   region_id_pk as region_id_fk,            \
-                                                   customer_id_pk as customer_id_fk,        \
-                                                   payment_id_pk as payment_id_fk,          \
-                                                   product_id_pk as product_id_fk,          \
-                                                   promo_code_id_pk as promo_code_id_fk,    \
-                                                   order_quantity,                          \
-                                                   local_total_order_amt,                   \
-                                                   local_tax_amt,                           \
-                                                   exhchange_rate,                          \
-                                                   us_total_order_amt,                      \
-                                                   usd_tax_amt                              \
-                                                   ")
-            all_sales_df.write.save_as_table("sales_dwh.consumption.sales_fact",mode="append")
-            print("✓ Successfully created Sales Fact table")
-        except Exception as e:
-            print(f"× Failed to create Sales Fact table: {str(e)}")
-
+        # the streams have to exist before the fact load for its rows to reach the aggregates
+        ensure_aggregate_streams(session)
+
+        date_range = order_date_span(session)
+
+        # (ok, replaced chunks), see create_sales_fact_chunked
+        def build_fact():
+            if fact_chunk_days:
+                return create_sales_fact_chunked(session, date_range, fact_chunk_days, fact_chunk_workers, reset_fact_chunks)
+            return create_sales_fact(all_sales_df,session), 0
+
+        def dimension_builds(sales_df, dim_session):
+            builds = [
+                lambda: create_date_dim(sales_df,dim_session,date_range),
+                lambda: create_region_dim(sales_df,dim_session),
+                lambda: create_product_dim(sales_df,dim_session),
+                lambda: create_customer_dim(sales_df,dim_session),
+            ]
+            if USE_ORDER_ATTR_DIM:
+                builds.append(lambda: create_order_attr_dim(sales_df,dim_session))
+            else:
+                builds.append(lambda: create_promocode_dim(sales_df,dim_session))
+                builds.append(lambda: create_payment_dim(sales_df,dim_session))
+            return builds
+
+        check_key_strategy(session)
+        check_order_attr_mode(session)
+        if use_hash_keys():
+            # keys don't depend on dimension inserts, so dimensions and fact load concurrently.
+            # The dimensions get their own session: the chunked fact build runs transactions
+            # on this one, which must not take in (or roll back) the dimension inserts.
+            dim_session = get_snowpark_session()
+            try:
+                with stage_compute(session, "fact"):
+                    dim_session.use_warehouse(session.get_current_warehouse())
+                    builds = dimension_builds(load_all_sales(dim_session), dim_session)
+                    with ThreadPoolExecutor(max_workers=len(builds) + 1) as executor:
+                        dimension_futures = [executor.submit(build) for build in builds]
+                        fact_future = executor.submit(build_fact)
+                        dimensions_ok = all([future.result() for future in dimension_futures])
+                        fact_ok, replaced_chunks = fact_future.result()
+            finally:
+                dim_session.close()
+        else:
+            # Create dimensions
+            with stage_compute(session, "dimensions"):
+                dimensions_ok = all([build() for build in dimension_builds(all_sales_df, session)])
+
+            # the fact joins the dimensions, orders without their dimension rows would be dropped
+            if not dimensions_ok:
+                print("\n× Dimension build failed, skipping the sales fact and aggregates")
+                return False
+            with stage_compute(session, "fact"):
+                fact_ok, replaced_chunks = build_fact()
+
+        if not dimensions_ok:
+            # new fact rows have keys without dimension rows yet, the aggregate joins would drop
+            # them and the stream would move past them; they are aggregated on the next run
+            print("\n× Dimension build failed, skipping the aggregate refresh")
+            return False
+
+        if replaced_chunks:
+            # the deleted fact rows are still in the aggregates, the streams only add
+            print(f"▶ {replaced_chunks} fact chunk(s) replaced, rebuilding the aggregates")
+            rebuild_aggregates = True
+
+        # keep the reporting aggregates in step with the newly loaded fact rows
+        with stage_compute(session, "aggregates"):
+            aggregates_ok = refresh_sales_aggregates(session, rebuild=rebuild_aggregates)
+
+        if not (fact_ok and aggregates_ok):
+            print("\n× Data Modeling Process Completed with failures")
+            return False
         print("\n=== Data Modeling Process Completed ===")
+        return True
     except Exception as e:
         print(f"\n× Data Modeling Process Failed: {str(e)}")
+        return False
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {value}")
+    return number
+
+def cli():
+    parser = argparse.ArgumentParser(description="Build the consumption layer dimensions and sales fact")
+    parser.add_argument("--rebuild-aggregates", action="store_true", help="recompute the daily aggregates from the full sales_fact table (backfills)")
+    parser.add_argument("--fact-chunk-days", type=_positive_int, help="build the sales fact in order_dt chunks of this many days (restartable backfills)")
+    parser.add_argument("--fact-chunk-workers", type=_positive_int, default=1, help="chunks built in parallel")
+    parser.add_argument("--reset-fact-chunks", action="store_true", help="rebuild every chunk, also the ones whose curated rows did not change")
+    args = parser.parse_args()
+    if not main(rebuild_aggregates=args.rebuild_aggregates,
+                fact_chunk_days=args.fact_chunk_days,
+                fact_chunk_workers=args.fact_chunk_workers,
+                reset_fact_chunks=args.reset_fact_chunks):
+        sys.exit(1)
 
 if __name__ == '__main__':
-    main()
+    cli()
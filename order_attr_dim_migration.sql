@@ -0,0 +1,70 @@
+-- Opt-in migration to the order attributes junk dimension (ORDER_ATTR_DIM=Y in the
+-- environment). Replaces payment_dim and promo_code_dim by views over order_attr_dim,
+-- run it once when switching over; it is not part of sales_consumption.sql because
+-- the default mode (ORDER_ATTR_DIM unset) needs both dimensions as tables.
+-- data_modelling.py refuses to run when ORDER_ATTR_DIM and these tables disagree.
+use schema sales_dwh.consumption;
+create or replace sequence order_attr_dim_seq start = 1 increment = 1;
+create or replace transient table order_attr_dim(
+    order_attr_id_pk number primary key,
+    PAYMENT_METHOD text,
+    PAYMENT_PROVIDER text,
+    PROMOTION_CODE text,
+    country text,
+    region text,
+    isActive text(1)
+);
+
+-- Backfill order_attr_dim with the attribute combinations sales_fact references and
+-- point the fact rows at them, so the loaded fact keeps its payment and promo code
+-- attributes. Keys follow the strategy payment_dim was built with: the hash expression
+-- is surrogate_keys.hash_key_sql over data_modelling.ORDER_ATTR_COLUMNS, sequence keys
+-- come from order_attr_dim_seq. The aggregates keep their values, no rebuild is needed.
+set hash_keys = (
+    select count(*) > 0 and count_if(payment_id_pk = md5_number_lower64(concat_ws('|', coalesce(to_varchar(payment_method), ''), coalesce(to_varchar(payment_provider), ''), coalesce(to_varchar(country), ''), coalesce(to_varchar(region), '')))) = count(*)
+    from payment_dim
+);
+
+begin;
+insert into order_attr_dim (order_attr_id_pk, payment_method, payment_provider, promotion_code, country, region, isActive)
+select iff($hash_keys,
+           md5_number_lower64(concat_ws('|', coalesce(to_varchar(payment_method), ''), coalesce(to_varchar(payment_provider), ''), coalesce(to_varchar(promotion_code), ''), coalesce(to_varchar(country), ''), coalesce(to_varchar(region), ''))),
+           order_attr_dim_seq.nextval),
+       payment_method, payment_provider, promotion_code, country, region, 'Y'
+from (
+    select distinct p.payment_method, p.payment_provider, pc.promotion_code, p.country, p.region
+    from sales_fact f
+    join payment_dim p on f.payment_id_fk = p.payment_id_pk
+    join promo_code_dim pc on f.promo_code_id_fk = pc.promo_code_id_pk
+);
+
+update sales_fact f
+set payment_id_fk = m.order_attr_id_pk, promo_code_id_fk = m.order_attr_id_pk
+from (
+    select p.payment_id_pk, pc.promo_code_id_pk, a.order_attr_id_pk
+    from payment_dim p
+    join promo_code_dim pc on equal_null(pc.country, p.country) and equal_null(pc.region, p.region)
+    join order_attr_dim a on equal_null(a.payment_method, p.payment_method)
+        and equal_null(a.payment_provider, p.payment_provider)
+        and equal_null(a.promotion_code, pc.promotion_code)
+        and equal_null(a.country, p.country)
+        and equal_null(a.region, p.region)
+) m
+where f.payment_id_fk = m.payment_id_pk and f.promo_code_id_fk = m.promo_code_id_pk;
+commit;
+
+-- compatibility views, sales_fact payment_id_fk and promo_code_id_fk both hold order_attr_id_pk
+alter table sales_fact drop constraint fk_sales_payment;
+alter table sales_fact drop constraint fk_sales_promot;
+alter table sales_fact add
+    constraint fk_sales_order_attr FOREIGN KEY (PAYMENT_ID_FK) REFERENCES order_attr_dim (ORDER_ATTR_ID_PK) NOT ENFORCED;
+drop table if exists payment_dim;
+drop table if exists promo_code_dim;
+
+create or replace view payment_dim as
+select order_attr_id_pk as payment_id_pk, payment_method, payment_provider, country, region, isActive
+from order_attr_dim;
+
+create or replace view promo_code_dim as
+select order_attr_id_pk as promo_code_id_pk, promotion_code, country, region, isActive
+from order_attr_dim;
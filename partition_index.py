@@ -0,0 +1,236 @@
+import os
+import re
+import sys
+import csv
+import json
+import hashlib
+import logging
+import argparse
+from decimal import Decimal, ROUND_HALF_UP
+from collections import Counter
+from surrogate_keys import hash_key
+
+# Setup logging
+logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
+
+# Local index of the landed sales files (row counts, order date ranges, schema
+# fingerprints) so planning steps don't need to list the stage or query tables.
+# Parquet is read from its footer, CSV/JSON with a single pass over the text.
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = "data/partition_index.json"
+ORDER_DATE_COLUMN = "Order Date"
+ORDER_ID_COLUMN = "Order ID"
+ORDER_AMOUNT_COLUMN = "Order Amount"
+DATA_EXTENSIONS = (".csv", ".parquet", ".json")
+
+def _partition(partition_dir: str) -> dict:
+    parts = {}
+    for part in partition_dir.replace("\\", "/").split("/"):
+        if "=" in part:
+            key, value = part.split("=", 1)
+            parts[key] = value
+    return parts
+
+def _fingerprint(columns) -> str:
+    return hashlib.md5("|".join(columns).encode("utf-8")).hexdigest()
+
+def _date_stats(dates: Counter) -> dict:
+    known = [d for d in dates if d]
+    return {
+        "row_count": sum(dates.values()),
+        "min_order_dt": min(known) if known else None,
+        "max_order_dt": max(known) if known else None,
+        "rows_by_date": dict(sorted((d or "", n) for d, n in dates.items())),
+    }
+
+def scan_parquet(path: str) -> dict:
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    columns = [f"{field.name}:{field.type}" for field in schema]
+
+    date_idx = schema.get_field_index(ORDER_DATE_COLUMN)
+    mins, maxs = [], []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(date_idx).statistics if date_idx >= 0 else None
+        if stats is None or not stats.has_min_max:
+            mins = maxs = None
+            break
+        mins.append(str(stats.min))
+        maxs.append(str(stats.max))
+
+    if mins and min(mins) == max(maxs):
+        # single day file, the footer is enough
+        dates = Counter({mins[0]: metadata.num_rows})
+    else:
+        # spans several days (or no statistics), read just the date column
+        table = parquet_file.read(columns=[ORDER_DATE_COLUMN])
+        dates = Counter(str(v) if v is not None else None for v in table.column(0).to_pylist())
+
+    return {"schema_fingerprint": _fingerprint(columns), **_date_stats(dates)}
+
+def scan_csv(path: str) -> dict:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        date_idx = header.index(ORDER_DATE_COLUMN) if ORDER_DATE_COLUMN in header else None
+        dates = Counter()
+        for row in reader:
+            if not row:
+                continue
+            dates[row[date_idx] if date_idx is not None and date_idx < len(row) else None] += 1
+    return {"schema_fingerprint": _fingerprint(header), **_date_stats(dates)}
+
+_JSON_KEY = re.compile(r'"([^"]+)"\s*:')
+_JSON_ORDER_DATE = re.compile(r'"' + ORDER_DATE_COLUMN + r'"\s*:\s*(?:"([^"]*)"|null)')
+
+def scan_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    # every record carries an order date, so counting them counts the records
+    dates = Counter(m.group(1) for m in _JSON_ORDER_DATE.finditer(text))
+    first_record = text[:text.find("}") + 1]
+    return {"schema_fingerprint": _fingerprint(_JSON_KEY.findall(first_record)), **_date_stats(dates)}
+
+SCANNERS = {".csv": scan_csv, ".parquet": scan_parquet, ".json": scan_json}
+
+def scan_file(path: str) -> dict:
+    extension = os.path.splitext(path)[1]
+    return SCANNERS[extension](path)
+
+def _read_orders(path: str):
+    # (order id, order amount, order date) of every record
+    columns = [ORDER_ID_COLUMN, ORDER_AMOUNT_COLUMN, ORDER_DATE_COLUMN]
+    extension = os.path.splitext(path)[1]
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+        records = pq.read_table(path, columns=columns).to_pylist()
+    elif extension == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            records = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+    for record in records:
+        yield tuple(record.get(c) for c in columns)
+
+def _amount(value) -> Decimal:
+    # same rounding as the ::number(10,2) cast in the COPY
+    if value in (None, ""):
+        return Decimal("0")
+    return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+# Order insensitive per-day fingerprint (row count, sum of order id hashes, sum of
+# order amounts) matching the aggregates reconcile.py computes in the warehouse.
+def fingerprint_file(path: str) -> dict:
+    fingerprints = {}
+    for order_id, amount, order_dt in _read_orders(path):
+        day = fingerprints.setdefault(str(order_dt or ""), {"rows": 0, "id_hash_sum": 0, "amount_sum": Decimal("0")})
+        day["rows"] += 1
+        day["id_hash_sum"] += hash_key(order_id)
+        day["amount_sum"] += _amount(amount)
+    return {d: {**f, "amount_sum": str(f["amount_sum"])} for d, f in sorted(fingerprints.items())}
+
+def load_index(path: str = DEFAULT_INDEX_PATH) -> dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    return {"version": INDEX_VERSION, "files": {}}
+
+def save_index(index: dict, path: str = DEFAULT_INDEX_PATH) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# Bring the index in line with the directory, re-scanning only new or changed files.
+def update_index(directory: str = "data/sales", path: str = DEFAULT_INDEX_PATH, fingerprints: bool = False) -> dict:
+    index = load_index(path)
+    entries = index["files"]
+    found = set()
+    errors = []
+    scanned = 0
+
+    for root, _, files in os.walk(directory):
+        partition_dir = os.path.relpath(root, directory)
+        for file in files:
+            if not file.endswith(DATA_EXTENSIONS):
+                continue
+            full_path = os.path.join(root, file)
+            key = os.path.join(partition_dir, file).replace("\\", "/")
+            found.add(key)
+            stat = os.stat(full_path)
+            entry = entries.get(key)
+            unchanged = entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+            # fingerprints need a full read, so they are only computed on request and then cached
+            if unchanged and (not fingerprints or "fingerprints" in entry):
+                continue
+            try:
+                if not unchanged:
+                    partition = _partition(partition_dir)
+                    entry = entries[key] = {
+                        "source": partition.get("source"),
+                        "format": partition.get("format"),
+                        "partition_date": partition.get("date"),
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                        **scan_file(full_path),
+                    }
+                if fingerprints:
+                    entry["fingerprints"] = fingerprint_file(full_path)
+            except Exception as e:
+                logging.error(f"Failed to index {key}: {e}")
+                entries.pop(key, None)
+                errors.append(key)
+                continue
+            scanned += 1
+
+    removed = [key for key in entries if key not in found]
+    for key in removed:
+        del entries[key]
+
+    # files that could not be scanned leave the index incomplete, callers
+    # deriving ranges from it should fall back to the warehouse
+    changed = scanned or removed or errors != index.get("errors", [])
+    index["errors"] = errors
+    if changed:
+        save_index(index, path)
+    logging.info(f"Partition index: {len(entries)} file(s), {scanned} scanned, {len(removed)} removed, {len(errors)} failed")
+    return index
+
+def order_date_range(index: dict, source: str = None):
+    entries = [e for e in index["files"].values() if source is None or e["source"] == source]
+    mins = [e["min_order_dt"] for e in entries if e["min_order_dt"]]
+    maxs = [e["max_order_dt"] for e in entries if e["max_order_dt"]]
+    if not mins:
+        return None
+    return min(mins), max(maxs)
+
+def rows_by_source_date(index: dict) -> dict:
+    # {(source, order_dt): rows}
+    totals = Counter()
+    for entry in index["files"].values():
+        for order_dt, rows in entry["rows_by_date"].items():
+            totals[(entry["source"], order_dt)] += rows
+    return dict(totals)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the local partition index of data/sales")
+    parser.add_argument("--directory", default="data/sales")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    index = update_index(args.directory, args.index)
+    for source in sorted({e["source"] for e in index["files"].values()}):
+        entries = [e for e in index["files"].values() if e["source"] == source]
+        start, end = order_date_range(index, source) or (None, None)
+        fingerprints = {e["schema_fingerprint"] for e in entries}
+        logging.info(f"{source}: {len(entries)} file(s), {sum(e['row_count'] for e in entries)} rows, "
+                     f"{start} .. {end}, {len(fingerprints)} schema(s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from decimal import Decimal
+from snowflake.snowpark import Session
+from partition_index import update_index, DEFAULT_INDEX_PATH
+from surrogate_keys import hash_key_sql
+
+# initiate logging at info level
+logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
+
+# Cross-layer reconciliation per source and order_dt. Every layer is reduced by one
+# grouped query to (rows, sum of order id hashes, sum of order amounts), which is
+# order insensitive, so layers can be compared without row level diffs.
+SOURCES = {
+    "IN": {"source_table": "sales_dwh.source.in_sales_order", "curated_table": "sales_dwh.curated.in_sales_order"},
+    "US": {"source_table": "sales_dwh.source.us_sales_order", "curated_table": "sales_dwh.curated.us_sales_order"},
+    "FR": {"source_table": "sales_dwh.source.fr_sales_order", "curated_table": "sales_dwh.curated.fr_sales_order"},
+}
+
+METRICS = ["rows", "id_hash_sum", "amount_sum"]
+
+# (upstream layer, downstream layer, metrics that must agree)
+# COPY_HISTORY only knows row counts, keyed on the file's date= partition, and only
+# covers its look back window, so it is compared with the files landed in that window
+LAYER_CHECKS = [
+    ("files_in_window", "loaded", ["rows"]),
+    ("files", "source", METRICS),
+    ("source_eligible", "curated", METRICS),
+    ("curated", "fact", METRICS),
+]
+
+# snowpark session
+def get_snowpark_session() -> Session:
+    connection_parameters = {
+        "ACCOUNT": os.getenv("ACCOUNT_ID"),
+        "USER": os.getenv("USER"),
+        "PASSWORD": os.getenv("PASSWORD"),
+        "ROLE": os.getenv("ROLE"),
+        "DATABASE": os.getenv("DATABASE"),
+        "SCHEMA": os.getenv("SCHEMA"),
+        "WAREHOUSE": os.getenv("WAREHOUSE")
+    }
+    # creating snowflake session object
+    return Session.builder.configs(connection_parameters).create()
+
+def _metrics(rows, id_hash_sum, amount_sum) -> dict:
+    return {
+        "rows": int(rows or 0),
+        "id_hash_sum": int(id_hash_sum or 0),
+        "amount_sum": Decimal(str(amount_sum or 0)),
+    }
+
+def _collect(session, query: str) -> dict:
+    layer = {}
+    for row in session.sql(query).collect():
+        r = row.as_dict()
+        layer[(r["SOURCE"], str(r["ORDER_DT"]))] = _metrics(r.get("ROW_CNT"), r.get("ID_HASH_SUM"), r.get("AMOUNT_SUM"))
+    return layer
+
+def files_layer(index: dict) -> dict:
+    layer = {}
+    for entry in index["files"].values():
+        for order_dt, fingerprint in entry.get("fingerprints", {}).items():
+            metrics = layer.setdefault((entry["source"], order_dt), _metrics(0, 0, 0))
+            metrics["rows"] += fingerprint["rows"]
+            metrics["id_hash_sum"] += fingerprint["id_hash_sum"]
+            metrics["amount_sum"] += Decimal(fingerprint["amount_sum"])
+    return layer
+
+# COPY_HISTORY knows files, not order dates: the row counts of the files landed since
+# landed_since per (source, date= partition), which is how loaded_layer groups the loads
+def partition_files_layer(index: dict, landed_since: float = None) -> dict:
+    layer = {}
+    for entry in index["files"].values():
+        if landed_since is not None and entry["mtime"] < landed_since:
+            continue
+        metrics = layer.setdefault((entry["source"], entry["partition_date"]), _metrics(0, 0, 0))
+        metrics["rows"] += entry["row_count"]
+    return layer
+
+def loaded_layer(session, history_days: int) -> dict:
+    queries = [f"""
+        select '{source}' as source,
+               regexp_substr(file_name, 'date=([0-9-]+)', 1, 1, 'e') as order_dt,
+               sum(row_count) as row_cnt
+        from table(sales_dwh.information_schema.copy_history(
+            table_name => '{tables["source_table"]}',
+            start_time => dateadd(day, -{history_days}, current_timestamp())))
+        group by 1, 2
+    """ for source, tables in SOURCES.items()]
+    return _collect(session, " union all ".join(queries))
+
+def source_layers(session):
+    queries = [f"""
+        select '{source}' as source, order_dt,
+               count(*) as row_cnt,
+               sum({hash_key_sql('order_id')}) as id_hash_sum,
+               sum(final_order_amount) as amount_sum,
+               count_if(eligible) as eligible_row_cnt,
+               sum(iff(eligible, {hash_key_sql('order_id')}, 0)) as eligible_id_hash_sum,
+               sum(iff(eligible, final_order_amount, 0)) as eligible_amount_sum
+        from (select *, payment_status = 'Paid' and shipping_status = 'Delivered' as eligible
+              from {tables["source_table"]})
+        group by 1, 2
+    """ for source, tables in SOURCES.items()]
+    source, eligible = {}, {}
+    for row in session.sql(" union all ".join(queries)).collect():
+        r = row.as_dict()
+        key = (r["SOURCE"], str(r["ORDER_DT"]))
+        source[key] = _metrics(r["ROW_CNT"], r["ID_HASH_SUM"], r["AMOUNT_SUM"])
+        # only paid and delivered orders are curated
+        eligible[key] = _metrics(r["ELIGIBLE_ROW_CNT"], r["ELIGIBLE_ID_HASH_SUM"], r["ELIGIBLE_AMOUNT_SUM"])
+    return source, eligible
+
+def curated_layer(session) -> dict:
+    # the forex outer join can add rows without an order, they are not sales
+    queries = [f"""
+        select '{source}' as source, order_dt,
+               count(*) as row_cnt,
+               sum({hash_key_sql('order_id')}) as id_hash_sum,
+               sum(local_total_order_amt) as amount_sum
+        from {tables["curated_table"]}
+        where order_id is not null
+        group by 1, 2
+    """ for source, tables in SOURCES.items()]
+    return _collect(session, " union all ".join(queries))
+
+def fact_layer(session) -> dict:
+    # region_dim.country is the source code (IN, US, FR)
+    return _collect(session, f"""
+        select r.country as source, d.order_dt,
+               count(*) as row_cnt,
+               sum({hash_key_sql('f.order_code')}) as id_hash_sum,
+               sum(f.local_total_order_amt) as amount_sum
+        from sales_dwh.consumption.sales_fact f
+        join sales_dwh.consumption.date_dim d on f.date_id_fk = d.date_id_pk
+        join sales_dwh.consumption.region_dim r on f.region_id_fk = r.region_id_pk
+        group by 1, 2
+    """)
+
+def compare_layers(layers: dict) -> list:
+    discrepancies = []
+    for upstream, downstream, metrics in LAYER_CHECKS:
+        if upstream not in layers or downstream not in layers:
+            continue
+        up, down = layers[upstream], layers[downstream]
+        for key in sorted(set(up) | set(down)):
+            expected = up.get(key, _metrics(0, 0, 0))
+            actual = down.get(key, _metrics(0, 0, 0))
+            for metric in metrics:
+                if expected[metric] != actual[metric]:
+                    source, order_dt = key
+                    discrepancies.append({
+                        "source": source,
+                        "order_dt": order_dt,
+                        "upstream": upstream,
+                        "downstream": downstream,
+                        "metric": metric,
+                        "expected": str(expected[metric]),
+                        "actual": str(actual[metric]),
+                    })
+    return discrepancies
+
+def reconcile(session, directory: str = "data/sales", index_path: str = DEFAULT_INDEX_PATH, history_days: int = 14) -> list:
+    print("\n=== Reconciling Sales Layers ===")
+    layers = {}
+
+    index = update_index(directory, index_path, fingerprints=True)
+    if index["errors"]:
+        print(f"× {len(index['errors'])} file(s) could not be indexed, skipping the file layer")
+    else:
+        layers["files"] = files_layer(index)
+        layers["files_in_window"] = partition_files_layer(index, landed_since=time.time() - history_days * 86400)
+
+    # loads before the window are not in COPY_HISTORY, only the partitions of files
+    # landed in the window are compared (older ones are covered by files -> source)
+    loaded = loaded_layer(session, history_days)
+    layers["loaded"] = {key: metrics for key, metrics in loaded.items() if key in layers.get("files_in_window", {})}
+    layers["source"], layers["source_eligible"] = source_layers(session)
+    layers["curated"] = curated_layer(session)
+    layers["fact"] = fact_layer(session)
+
+    for name, layer in layers.items():
+        print(f"▶ {name}: {len(layer)} source/day group(s), {sum(m['rows'] for m in layer.values())} rows")
+    print(f"▶ files -> loaded is compared for files landed in the last {history_days} day(s) only (COPY_HISTORY window)")
+    return compare_layers(layers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile row counts and fingerprints across files, source, curated and fact layers")
+    parser.add_argument("--directory", default="data/sales")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--history-days", type=int, default=14, help="COPY_HISTORY look back (at most 14 days)")
+    parser.add_argument("--save", action="store_true", help="append the discrepancies to sales_dwh.audit.reconciliation_result")
+    args = parser.parse_args()
+
+    session = get_snowpark_session()
+    try:
+        discrepancies = reconcile(session, args.directory, args.index, args.history_days)
+        if not discrepancies:
+            print("✓ All layers reconcile")
+            return
+        print(f"\n× {len(discrepancies)} discrepancy(ies):")
+        for d in discrepancies:
+            print(f"  {d['source']} {d['order_dt']} {d['upstream']} -> {d['downstream']}: "
+                  f"{d['metric']} expected {d['expected']}, got {d['actual']}")
+        if args.save:
+            session.create_dataframe(discrepancies).selectExpr(
+                "*", "current_timestamp() as checked_at"
+            ).write.save_as_table("sales_dwh.audit.reconciliation_result", mode="append")
+            print("✓ Saved discrepancies to sales_dwh.audit.reconciliation_result")
+        sys.exit(1)
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    main()
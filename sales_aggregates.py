@@ -0,0 +1,164 @@
+import os
+import sys
+import logging
+import argparse
+
+# initiate logging at info level
+logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
+
+# Daily aggregates maintained on top of sales_fact for the reporting queries.
+# Each aggregate owns an append-only stream on sales_fact, so an incremental
+# refresh only reads the fact rows loaded since its previous refresh.
+AGGREGATES = {
+    "sales_daily_brand_agg": {
+        "stream": "sales_fact_brand_agg_stream",
+        "dimensions": ["d.order_dt", "r.country", "r.region", "p.brand"],
+        "joins": """
+            join sales_dwh.consumption.date_dim d on f.date_id_fk = d.date_id_pk
+            join sales_dwh.consumption.region_dim r on f.region_id_fk = r.region_id_pk
+            join sales_dwh.consumption.product_dim p on f.product_id_fk = p.product_id_pk
+        """,
+    },
+    "sales_daily_payment_agg": {
+        "stream": "sales_fact_payment_agg_stream",
+        "dimensions": ["d.order_dt", "r.country", "r.region", "pm.payment_method", "pm.payment_provider"],
+        "joins": """
+            join sales_dwh.consumption.date_dim d on f.date_id_fk = d.date_id_pk
+            join sales_dwh.consumption.region_dim r on f.region_id_fk = r.region_id_pk
+            join sales_dwh.consumption.payment_dim pm on f.payment_id_fk = pm.payment_id_pk
+        """,
+    },
+}
+
+# measures are additive, so a refresh can add the delta onto the existing row
+MEASURES = {
+    "order_count": "count(*)",
+    "order_quantity": "sum(f.order_quantity)",
+    "local_total_order_amt": "sum(f.local_total_order_amt)",
+    "local_tax_amt": "sum(f.local_tax_amt)",
+    "us_total_order_amt": "sum(f.us_total_order_amt)",
+    "usd_tax_amt": "sum(f.usd_tax_amt)",
+}
+
+# snowpark session
+def get_snowpark_session():
+    # imported here, so the SQL generation can be used without snowpark
+    from snowflake.snowpark import Session
+    connection_parameters = {
+        "ACCOUNT": os.getenv("ACCOUNT_ID"),
+        "USER": os.getenv("USER"),
+        "PASSWORD": os.getenv("PASSWORD"),
+        "ROLE": os.getenv("ROLE"),
+        "DATABASE": os.getenv("DATABASE"),
+        "SCHEMA": os.getenv("SCHEMA"),
+        "WAREHOUSE": os.getenv("WAREHOUSE")
+    }
+    # creating snowflake session object
+    return Session.builder.configs(connection_parameters).create()
+
+def _column_name(dimension: str) -> str:
+    # "r.country" -> "country"
+    return dimension.split(".")[-1]
+
+def _aggregate_query(agg: dict, source: str) -> str:
+    dimensions = ", ".join(agg["dimensions"])
+    measures = ", ".join(f"{expr} as {name}" for name, expr in MEASURES.items())
+    return f"""
+        select {dimensions}, {measures}
+        from {source} f
+        {agg["joins"]}
+        group by {dimensions}
+    """
+
+def _ensure_stream(session, agg: dict, replace: bool = False) -> None:
+    create = "create or replace stream" if replace else "create stream if not exists"
+    session.sql(f"""
+        {create} sales_dwh.consumption.{agg["stream"]}
+        on table sales_dwh.consumption.sales_fact
+        append_only = true
+    """).collect()
+
+def _stream_exists(session, agg: dict) -> bool:
+    # LIKE treats "_" as a wildcard, so compare the returned names
+    rows = session.sql(f"show streams like '{agg['stream']}' in schema sales_dwh.consumption").collect()
+    return any(row.as_dict()["name"].upper() == agg["stream"].upper() for row in rows)
+
+# Create the missing streams before the fact load, so the rows it appends are captured.
+# Fact rows loaded before a stream existed are in no stream, so the aggregate is rebuilt
+# right away; a failed rebuild drops the stream again and the next run retries it.
+def ensure_aggregate_streams(session) -> None:
+    for table, agg in AGGREGATES.items():
+        if not _stream_exists(session, agg):
+            print(f"▶ {agg['stream']} is missing, rebuilding {table} from sales_fact")
+            rebuild_aggregate(session, table)
+
+def refresh_aggregate(session, table: str) -> None:
+    agg = AGGREGATES[table]
+    keys = [_column_name(d) for d in agg["dimensions"]]
+    delta_sql = _aggregate_query(agg, f"sales_dwh.consumption.{agg['stream']}")
+    on_clause = " and ".join(f"equal_null(t.{k}, s.{k})" for k in keys)
+    update_clause = ", ".join(f"t.{m} = t.{m} + s.{m}" for m in MEASURES)
+    insert_cols = ", ".join(keys + list(MEASURES) + ["last_refreshed_at"])
+    insert_vals = ", ".join([f"s.{c}" for c in keys + list(MEASURES)] + ["current_timestamp()"])
+
+    # consuming the stream in a DML statement advances its offset, so the same
+    # fact rows are never added twice
+    result = session.sql(f"""
+        merge into sales_dwh.consumption.{table} t
+        using ({delta_sql}) s
+        on {on_clause}
+        when matched then update set {update_clause}, t.last_refreshed_at = current_timestamp()
+        when not matched then insert ({insert_cols}) values ({insert_vals})
+    """).collect()
+    row = result[0].as_dict() if result else {}
+    print(f"✓ Refreshed {table}: {row.get('number of rows inserted', 0)} inserted, {row.get('number of rows updated', 0)} updated")
+
+def rebuild_aggregate(session, table: str) -> None:
+    agg = AGGREGATES[table]
+    # Reset the stream, then aggregate sales_fact as of the new stream offset: rows
+    # committed after the reset are only in the stream, rows before it only in the
+    # rebuild. (CREATE STREAM is DDL and commits on its own, so a transaction can't
+    # hold both statements; the AT clause pins the read instead.)
+    _ensure_stream(session, agg, replace=True)
+
+    keys = [_column_name(d) for d in agg["dimensions"]]
+    full_sql = _aggregate_query(agg, f"sales_dwh.consumption.sales_fact at(stream => 'sales_dwh.consumption.{agg['stream']}')")
+    insert_cols = ", ".join(keys + list(MEASURES) + ["last_refreshed_at"])
+    try:
+        session.sql(f"""
+            insert overwrite into sales_dwh.consumption.{table} ({insert_cols})
+            select *, current_timestamp() from ({full_sql})
+        """).collect()
+    except Exception as e:
+        # the stream was already reset: drop it, so the next run finds it missing and rebuilds
+        session.sql(f"drop stream if exists sales_dwh.consumption.{agg['stream']}").collect()
+        raise RuntimeError(f"{e} ({table} is rebuilt on the next run)") from e
+    print(f"✓ Rebuilt {table} from sales_fact")
+
+def refresh_sales_aggregates(session, rebuild: bool = False) -> bool:
+    print("\n=== Refreshing Sales Aggregates ===")
+    refreshed = True
+    for table, agg in AGGREGATES.items():
+        try:
+            if rebuild or not _stream_exists(session, agg):
+                rebuild_aggregate(session, table)
+            else:
+                refresh_aggregate(session, table)
+        except Exception as e:
+            print(f"× Failed to refresh {table}: {str(e)}")
+            refreshed = False
+    return refreshed
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the daily sales aggregates in the consumption layer")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the aggregates from the full sales_fact table (backfills)")
+    args = parser.parse_args()
+
+    session = get_snowpark_session()
+    try:
+        refresh_sales_aggregates(session, rebuild=args.rebuild)
+    finally:
+        session.close()
+
+if __name__ == '__main__':
+    main()
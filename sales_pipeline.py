@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import importlib
+import subprocess
+from collections import Counter
+
+# Setup logging
+logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
+
+# Single entry point for the pipeline scripts. Nothing heavy (Snowpark, pandas,
+# pyarrow) is imported here; each subcommand imports only the module it runs.
+COMMANDS = {
+    "upload": ("uploader", "main", "upload data/sales to the internal stage"),
+    "ingest": ("ingest_sales", "main", "COPY staged files into the source tables"),
+    "curate": (None, None, "curate source orders (IN, US, FR or a subset)"),
+    "model": ("data_modelling", "cli", "build the dimensions, sales fact and aggregates"),
+    "aggregates": ("sales_aggregates", "main", "refresh or rebuild the daily sales aggregates"),
+    "watch": ("sales_watcher", "main", "load new date partitions in micro-batches"),
+    "index": ("partition_index", "main", "refresh the local partition index"),
+    "reconcile": ("reconcile", "main", "reconcile files, source, curated and fact layers"),
+    "run": (None, None, "incremental run: load only new files, skip everything when nothing landed"),
+}
+
+CURATION_MODULES = {"IN": "source_IN", "US": "source_US", "FR": "source_FR"}
+
+def _dispatch(command: str, argv: list) -> None:
+    module_name, function_name, _ = COMMANDS[command]
+    # the modules parse sys.argv themselves
+    sys.argv = [f"sales-pipeline {command}"] + argv
+    getattr(importlib.import_module(module_name), function_name)()
+
+# returns the sources whose curation failed
+def curate(argv: list) -> list:
+    parser = argparse.ArgumentParser(prog="sales-pipeline curate", description=COMMANDS["curate"][2])
+    # no choices=: argparse checks an empty nargs="*" list against them and rejects it
+    parser.add_argument("sources", nargs="*", metavar="source", help=f"one of {', '.join(sorted(CURATION_MODULES))} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [source for source in args.sources if source not in CURATION_MODULES]
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}")
+    failed = []
+    for source in args.sources or sorted(CURATION_MODULES):
+        logging.info(f"Curating {source} sales orders...")
+        try:
+            curated = importlib.import_module(CURATION_MODULES[source]).main()
+        except Exception as e:
+            logging.error(f"Failed to curate {source} sales orders: {e}")
+            curated = False
+        if curated is False:
+            failed.append(source)
+    return failed
+
+def _load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_state(state: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+# returns False when a step failed; the state then only advances for the files that
+# made it through every step, the others are picked up again by the next run
+def run_incremental(argv: list) -> bool:
+    parser = argparse.ArgumentParser(prog="sales-pipeline run", description=COMMANDS["run"][2])
+    parser.add_argument("--directory", default="data/sales")
+    parser.add_argument("--index", default="data/partition_index.json")
+    parser.add_argument("--state", default="data/pipeline_state.json", help="files processed by previous runs")
+    parser.add_argument("--stage-location", default="@sales_dwh.source.my_internal_stg")
+    parser.add_argument("--force", action="store_true", help="run the downstream steps even when no file changed")
+    args = parser.parse_args(argv)
+
+    from partition_index import update_index
+    index = update_index(args.directory, args.index)
+    snapshot = {key: [entry["size"], entry["mtime"]] for key, entry in index["files"].items()}
+    state = _load_state(args.state)
+    new_files = sorted(key for key, version in snapshot.items() if state.get(key) != version)
+
+    if not new_files and not args.force:
+        logging.info("No new sales files, nothing to do.")
+        return True
+    logging.info(f"{len(new_files)} new or changed file(s)")
+
+    # only now pay for the Snowflake imports
+    from ingest_sales import get_snowpark_session
+    from compute_policy import stage_compute
+    from sales_watcher import LandedFile, SnowflakeStage, parse_partition
+
+    landed = []
+    for key in new_files:
+        partition_dir, file_name = os.path.split(key)
+        entry = index["files"][key]
+        landed.append(LandedFile(os.path.abspath(os.path.join(args.directory, key)), partition_dir, file_name,
+                                 parse_partition(partition_dir).get("source"), entry["format"], entry["size"]))
+    sources = sorted({f.source for f in landed}) if landed else sorted(CURATION_MODULES)
+
+    failed_sources = set()
+    session = get_snowpark_session()
+    try:
+        stage = SnowflakeStage(session, args.stage_location)
+        if landed:
+            with stage_compute(session, "upload"):
+                stage.put(landed)
+            with stage_compute(session, "copy"):
+                for source in sources:
+                    try:
+                        stage.copy(source, [f for f in landed if f.source == source])
+                    except Exception as e:
+                        logging.error(f"COPY failed for {source}: {e}")
+                        failed_sources.add(source)
+    except Exception as e:
+        logging.error(f"Upload failed: {e}")
+        return False
+    finally:
+        session.close()
+
+    to_curate = [source for source in sources if source not in failed_sources]
+    if to_curate:
+        failed_sources.update(curate(to_curate))
+    modelled = importlib.import_module("data_modelling").main()
+
+    if not modelled:
+        # the fact and aggregates may lack any of the new files, process all of them again
+        logging.error("Data modelling failed, no file is marked as processed")
+        return False
+    # files of sources whose COPY or curation failed are retried by the next run
+    for key in new_files:
+        if index["files"][key]["source"] not in failed_sources:
+            state[key] = snapshot[key]
+    for key in [key for key in state if key not in snapshot]:
+        del state[key]
+    _save_state(state, args.state)
+    if failed_sources:
+        logging.error(f"Incremental run failed for {', '.join(sorted(failed_sources))}, their files will be retried")
+        return False
+    logging.info("Incremental run completed.")
+    return True
+
+# "import time:       412 |       9012 |   snowflake.snowpark" -> (cumulative us, depth, name)
+def _parse_importtime(stderr: str):
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # one separator space, then two spaces per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        yield int(cumulative), depth, name.strip()
+
+# Re-run the subcommand under -X importtime and summarise the import cost by top level package.
+def report_startup(argv: list, top: int = 15) -> int:
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__)] + argv,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - started
+
+    by_package = Counter()
+    for cumulative, depth, name in _parse_importtime(proc.stderr):
+        # depth 0 lines are the imports triggered directly, their cumulative time includes the rest
+        if depth == 0:
+            by_package[name.split(".")[0]] += cumulative
+    other_stderr = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+    if other_stderr:
+        print("\n".join(other_stderr), file=sys.stderr)
+
+    total_imports = sum(by_package.values())
+    print(f"\n=== Startup timing: sales-pipeline {' '.join(argv)} ===")
+    print(f"wall clock {elapsed * 1000:9.1f} ms")
+    print(f"imports    {total_imports / 1000:9.1f} ms")
+    for package, cumulative in by_package.most_common(top):
+        print(f"  {package:<30} {cumulative / 1000:9.1f} ms")
+    return proc.returncode
+
+def main():
+    parser = argparse.ArgumentParser(prog="sales-pipeline", description="Sales data pipeline")
+    parser.add_argument("--timing", action="store_true", help="report import and startup time of the subcommand")
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command",
+                        help=", ".join(f"{name} ({help_text})" for name, (_, _, help_text) in COMMANDS.items()))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments passed to the subcommand")
+    args = parser.parse_args()
+
+    if args.timing:
+        sys.exit(report_startup([args.command] + args.args))
+    if args.command == "curate":
+        if curate(args.args):
+            sys.exit(1)
+    elif args.command == "run":
+        if not run_incremental(args.args):
+            sys.exit(1)
+    else:
+        _dispatch(args.command, args.args)
+
+if __name__ == '__main__':
+    main()
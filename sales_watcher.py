@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import logging
+import argparse
+import threading
+from collections import namedtuple
+
+# Setup logging
+logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
+
+# source -> file type it lands as
+SOURCE_FORMATS = {"IN": "csv", "US": "parquet", "FR": "json"}
+
+LandedFile = namedtuple("LandedFile", ["local_path", "partition_dir", "file_name", "source", "file_type", "size"])
+
+# "source=IN/format=csv/date=2020-01-01" -> {"source": "IN", "format": "csv", "date": "2020-01-01"}
+def parse_partition(partition_dir: str) -> dict:
+    parts = {}
+    for part in partition_dir.replace("\\", "/").split("/"):
+        if "=" in part:
+            key, value = part.split("=", 1)
+            parts[key] = value
+    return parts
+
+# Scan the landing directory for sales files, returning only the ones whose size
+# did not change since the previous scan (so half written files are left alone).
+# Files that disappeared are dropped from seen and last_sizes, which keeps both
+# bounded by the landing directory in a long running watcher.
+def scan_landed_files(directory: str, seen: set, last_sizes: dict) -> list:
+    ready = []
+    found = set()
+    for root, _, files in os.walk(directory):
+        partition_dir = os.path.relpath(root, directory)
+        partition = parse_partition(partition_dir)
+        source = partition.get("source")
+        file_type = SOURCE_FORMATS.get(source)
+        if file_type is None or partition.get("format") != file_type:
+            continue
+        for file in files:
+            if not file.endswith("." + file_type):
+                continue
+            full_path = os.path.abspath(os.path.join(root, file))
+            found.add(full_path)
+            if full_path in seen:
+                continue
+            try:
+                size = os.path.getsize(full_path)
+            except OSError:
+                continue
+            if last_sizes.get(full_path) == size:
+                ready.append(LandedFile(full_path, partition_dir, file, source, file_type, size))
+                last_sizes.pop(full_path)
+            else:
+                last_sizes[full_path] = size
+    seen.intersection_update(found)
+    for path in [p for p in last_sizes if p not in found]:
+        del last_sizes[path]
+    return ready
+
+# Coalesce landed files into micro-batches, cut by file count, bytes or age of
+# the oldest pending file, whichever comes first.
+class MicroBatcher:
+    def __init__(self, max_files: int, max_bytes: int, max_wait: float):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_wait = max_wait
+        self.pending = []
+        self.pending_bytes = 0
+        self.first_arrival = None
+
+    def add(self, files: list) -> None:
+        if files and not self.pending:
+            self.first_arrival = time.monotonic()
+        self.pending.extend(files)
+        self.pending_bytes += sum(f.size for f in files)
+
+    def due(self) -> bool:
+        if not self.pending:
+            return False
+        return (len(self.pending) >= self.max_files
+                or self.pending_bytes >= self.max_bytes
+                or time.monotonic() - self.first_arrival >= self.max_wait)
+
+    def take(self) -> list:
+        batch = self.pending[:self.max_files]
+        self.pending = self.pending[self.max_files:]
+        self.pending_bytes = sum(f.size for f in self.pending)
+        self.first_arrival = time.monotonic() if self.pending else None
+        return batch
+
+# Stage paths mirror the COPY locations in ingest_sales.py:
+#   @stage/<file_type>/sales/source=XX/format=<file_type>/date=YYYY-MM-DD/<file>
+# and COPY file names are relative to .../format=<file_type>/
+def _copy_file_name(landed: LandedFile) -> str:
+    date = parse_partition(landed.partition_dir).get("date")
+    return f"date={date}/{landed.file_name}"
+
+class SnowflakeStage:
+    def __init__(self, session, stage_location: str):
+        self.session = session
+        self.stage_location = stage_location
+
+    def put(self, files: list) -> None:
+        from uploader import upload_files
+        for file_type in sorted({f.file_type for f in files}):
+            typed = [f for f in files if f.file_type == file_type]
+            upload_files([f.file_name for f in typed],
+                         [f"sales/{f.partition_dir}" for f in typed],
+                         [f.local_path for f in typed],
+                         self.stage_location, file_type, session=self.session)
+
+    def copy(self, source: str, files: list) -> None:
+        from ingest_sales import ingest_in_sales, ingest_us_sales, ingest_fr_sales
+        loaders = {"IN": ingest_in_sales, "US": ingest_us_sales, "FR": ingest_fr_sales}
+        # the loaders log and swallow errors, raise so the batch is retried
+        if not loaders[source](self.session, files=[_copy_file_name(f) for f in files]):
+            raise RuntimeError(f"COPY of {len(files)} {source} file(s) failed")
+
+# Local stand-in for the internal stage: files are copied under a directory with
+# the same layout and every scoped COPY is appended to _copy_log.jsonl.
+class LocalStage:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, files: list) -> None:
+        for f in files:
+            target_dir = os.path.join(self.root, f.file_type, "sales", f.partition_dir)
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.copy2(f.local_path, os.path.join(target_dir, f.file_name))
+            logging.info(f"Uploaded {f.file_name} to {target_dir}")
+
+    def copy(self, source: str, files: list) -> None:
+        entry = {"source": source, "files": [_copy_file_name(f) for f in files], "copied_at": time.time()}
+        with open(os.path.join(self.root, "_copy_log.jsonl"), "a") as log:
+            log.write(json.dumps(entry) + "\n")
+        logging.info(f"COPY {source}: {len(files)} file(s)")
+
+class SalesWatcher:
+    def __init__(self, directory: str, stage, batcher: MicroBatcher, poll_interval: float = 2.0,
+                 max_in_flight: int = 4, workers: int = 1, state_path: str = None):
+        self.directory = directory
+        self.state_path = state_path
+        self.stage = stage
+        self.batcher = batcher
+        self.poll_interval = poll_interval
+        self.workers = workers
+        # bounded, so a slow warehouse makes the scanner wait instead of piling up batches
+        self.batches = queue.Queue(maxsize=max_in_flight)
+        # files loaded or being loaded; the loaded ones are kept in state_path across restarts
+        self.seen = set()
+        self.loaded = set()
+        self.seen_lock = threading.Lock()
+        if state_path and os.path.exists(state_path):
+            with open(state_path) as f:
+                self.loaded = set(json.load(f))
+            self.seen.update(self.loaded)
+        self.last_sizes = {}
+        self.stop_event = threading.Event()
+
+    def _save_state(self) -> None:
+        # called with seen_lock held
+        if not self.state_path:
+            return
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(sorted(self.loaded), f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def mark_existing(self) -> None:
+        # opt in: files already in the landing directory are treated as loaded
+        with self.seen_lock:
+            for root, _, files in os.walk(self.directory):
+                for file in files:
+                    self.loaded.add(os.path.abspath(os.path.join(root, file)))
+            self.seen.update(self.loaded)
+            self._save_state()
+
+    def poll(self) -> None:
+        with self.seen_lock:
+            ready = scan_landed_files(self.directory, self.seen, self.last_sizes)
+            self.seen.update(f.local_path for f in ready)
+            # forget loaded files that were removed from the landing directory
+            self.loaded.intersection_update(self.seen)
+        if ready:
+            logging.info(f"Detected {len(ready)} new file(s)")
+        self.batcher.add(ready)
+
+    def dispatch_due(self, flush: bool = False) -> None:
+        while self.batcher.due() or (flush and self.batcher.pending):
+            batch = self.batcher.take()
+            # blocks while max_in_flight batches are waiting (backpressure)
+            self.batches.put(batch)
+
+    def process_batch(self, batch: list) -> None:
+        started = time.monotonic()
+        try:
+            self.stage.put(batch)
+            for source in sorted({f.source for f in batch}):
+                self.stage.copy(source, [f for f in batch if f.source == source])
+            logging.info(f"Loaded batch of {len(batch)} file(s) in {time.monotonic() - started:.1f}s")
+            with self.seen_lock:
+                self.loaded.update(f.local_path for f in batch)
+                self._save_state()
+        except Exception as e:
+            logging.error(f"Failed to load batch, files will be retried: {e}")
+            with self.seen_lock:
+                self.seen.difference_update(f.local_path for f in batch)
+
+    def _worker(self) -> None:
+        while True:
+            batch = self.batches.get()
+            try:
+                if batch is None:
+                    return
+                self.process_batch(batch)
+            finally:
+                self.batches.task_done()
+
+    def run(self, once: bool = False) -> None:
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            if once:
+                # two scans so every file passes the stable size check
+                self.poll()
+                self.poll()
+            else:
+                while not self.stop_event.is_set():
+                    self.poll()
+                    self.dispatch_due()
+                    self.stop_event.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            logging.info("Stopping watcher...")
+        finally:
+            self.dispatch_due(flush=True)
+            for _ in threads:
+                self.batches.put(None)
+            for t in threads:
+                t.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch data/sales and load new date partitions in micro-batches")
+    parser.add_argument("--directory", default="data/sales")
+    parser.add_argument("--stage-location", default="@sales_dwh.source.my_internal_stg")
+    parser.add_argument("--local-stage", help="copy to this directory instead of the Snowflake stage")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between scans")
+    parser.add_argument("--max-files", type=int, default=50, help="cut a batch at this many files")
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024 * 1024, help="cut a batch at this many bytes")
+    parser.add_argument("--max-wait", type=float, default=30.0, help="cut a batch when its oldest file waited this many seconds")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="batches queued for loading before scanning pauses")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--state", default="data/watcher_state.json", help="files loaded by previous runs, kept across restarts")
+    parser.add_argument("--skip-existing", action="store_true", help="treat files already present at startup as loaded")
+    parser.add_argument("--once", action="store_true", help="load what is there and exit")
+    args = parser.parse_args()
+
+    session = None
+    if args.local_stage:
+        stage = LocalStage(args.local_stage)
+    else:
+        from ingest_sales import get_snowpark_session
+        session = get_snowpark_session()
+        logging.info("🔗 Snowpark session created.")
+        stage = SnowflakeStage(session, args.stage_location)
+
+    watcher = SalesWatcher(args.directory, stage,
+                           MicroBatcher(args.max_files, args.max_bytes, args.max_wait),
+                           poll_interval=args.poll_interval,
+                           max_in_flight=args.max_in_flight,
+                           workers=args.workers,
+                           state_path=args.state)
+    # files present at startup are loaded unless they were loaded before (the state file,
+    # and COPY load metadata for anything loaded without it)
+    if args.skip_existing:
+        watcher.mark_existing()
+    logging.info(f"Watching {args.directory} for new sales files...")
+    try:
+        watcher.run(once=args.once)
+    finally:
+        if session:
+            session.close()
+            logging.info("🔒 Snowpark session closed.")
+
+if __name__ == '__main__':
+    main()
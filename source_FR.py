@@ -4,6 +4,7 @@ import logging,os
 from snowflake.snowpark import Session, DataFrame
 from snowflake.snowpark.functions import col,lit,row_number, rank
 from snowflake.snowpark import Window
+from compute_policy import stage_compute
 
 # initiate logging at info level
 logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
@@ -79,7 +80,9 @@ def main():
     )
 
     #final_sales_df.show(5)
-    final_sales_df.write.save_as_table("sales_dwh.curated.fr_sales_order",mode="append")
+    with stage_compute(session, "curation"):
+        final_sales_df.write.save_as_table("sales_dwh.curated.fr_sales_order",mode="append")
+    return True
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
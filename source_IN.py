@@ -3,6 +3,7 @@ import logging,os
 from snowflake.snowpark import Session, DataFrame
 from snowflake.snowpark.functions import col, lit, rank
 from snowflake.snowpark import Window
+from compute_policy import stage_compute
 
 # Setup logging
 logging.basicConfig(
@@ -94,13 +95,16 @@ def main():
 
         logging.info("Final dataframe created. Preparing to write to curated table...")
 
-        final_sales_df.write.save_as_table("sales_dwh.curated.in_sales_order", mode="append")
+        with stage_compute(session, "curation"):
+            final_sales_df.write.save_as_table("sales_dwh.curated.in_sales_order", mode="append")
         logging.info("Data successfully ingested into sales_dwh.curated.in_sales_order")
         print("Ingestion completed successfully.")
+        return True
 
     except Exception as e:
         logging.error(f"Error occurred during execution: {e}")
         print("An error occurred. Check logs for more details.")
+        return False
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,41 @@
+import os
+import hashlib
+import datetime
+
+# Surrogate key strategy for the consumption layer:
+#   sequence - *_seq.nextval, assigned inside the warehouse at insert time (default)
+#   hash     - stable hash of the natural key, computed the same way in SQL and in python,
+#              so fact keys don't depend on dimension inserts and reloads yield the same keys
+# The whole consumption layer uses one strategy, switching needs a rebuild of the
+# dimensions and sales_fact (data_modelling.check_key_strategy stops a mixed load).
+KEY_STRATEGY = os.getenv("KEY_STRATEGY", "sequence").lower()
+
+def use_hash_keys() -> bool:
+    return KEY_STRATEGY == "hash"
+
+# Natural key parts are only cast to text with NULL as '', so two rows get the same
+# key exactly when the dimension anti-joins consider them the same record.
+def natural_key(*values) -> str:
+    return "|".join("" if v is None else str(v) for v in values)
+
+# MD5_NUMBER_LOWER64 returns the lower 64 bits of the big endian MD5 digest as an unsigned number
+def hash_key(*values) -> int:
+    digest = hashlib.md5(natural_key(*values).encode("utf-8")).digest()
+    return int.from_bytes(digest[8:], "big")
+
+def hash_key_sql(*columns) -> str:
+    parts = ", ".join(f"coalesce(to_varchar({c}), '')" for c in columns)
+    return f"md5_number_lower64(concat_ws('|', {parts}))"
+
+# dates keep a readable yyyymmdd key, which is deterministic and still clusters by date
+def date_key(value) -> int:
+    return int(datetime.date.fromisoformat(str(value)).strftime("%Y%m%d"))
+
+def date_key_sql(column: str) -> str:
+    return f"to_number(to_char(to_date({column}), 'YYYYMMDD'))"
+
+# key expression for a dimension/fact insert under the configured strategy
+def key_sql(sequence: str, *columns) -> str:
+    if use_hash_keys():
+        return hash_key_sql(*columns)
+    return f"{sequence}.nextval"
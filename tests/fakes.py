@@ -0,0 +1,39 @@
+# In-memory stand-in for a snowpark session: records every statement and answers
+# the ones matching a registered substring.
+class FakeRow:
+    def __init__(self, **values):
+        self.values = values
+
+    def as_dict(self):
+        return self.values
+
+class FakeSession:
+    def __init__(self, warehouse="COMPUTE_WH", responses=None, fail_on=()):
+        self.warehouse = warehouse
+        # [(substring, rows)], the first match answers
+        self.responses = list(responses or [])
+        self.fail_on = fail_on
+        self.statements = []
+
+    def get_current_warehouse(self):
+        return f'"{self.warehouse}"' if self.warehouse else None
+
+    def use_warehouse(self, warehouse):
+        self.warehouse = warehouse
+
+    def sql(self, query):
+        self.statements.append(" ".join(query.split()))
+        session = self
+
+        class Result:
+            def collect(self):
+                if any(marker in query for marker in session.fail_on):
+                    raise RuntimeError(f"failed: {query}")
+                for marker, rows in session.responses:
+                    if marker in query:
+                        return rows
+                return []
+        return Result()
+
+    def executed(self, marker: str) -> list:
+        return [q for q in self.statements if marker in q]
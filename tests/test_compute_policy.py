@@ -0,0 +1,50 @@
+import pytest
+from compute_policy import stage_compute
+from fakes import FakeRow, FakeSession
+
+POLICY = {"fact": {"warehouse": "ETL_WH", "size": "large", "after": "suspend"}}
+
+def _session(fail_on=()):
+    return FakeSession(responses=[("show warehouses", [FakeRow(name="ETL_WH", size="X-Small")])], fail_on=fail_on)
+
+def test_switches_resizes_and_restores():
+    session = _session()
+    with stage_compute(session, "fact", POLICY):
+        assert session.warehouse == "ETL_WH"
+    assert session.executed("warehouse_size = LARGE")
+    assert session.executed("warehouse_size = XSMALL")
+    assert session.executed("suspend")
+    assert session.warehouse == "COMPUTE_WH"
+
+def test_failed_suspend_still_switches_back():
+    session = _session(fail_on=("suspend",))
+    with stage_compute(session, "fact", POLICY):
+        pass
+    assert session.warehouse == "COMPUTE_WH"
+
+def test_failed_resize_switches_back():
+    session = _session(fail_on=("= LARGE",))
+    with pytest.raises(RuntimeError):
+        with stage_compute(session, "fact", POLICY):
+            pytest.fail("the stage must not run on a failed resize")
+    assert session.warehouse == "COMPUTE_WH"
+
+def test_stage_without_policy_is_untouched():
+    session = _session()
+    with stage_compute(session, "copy", POLICY):
+        pass
+    assert session.statements == []
+    assert session.warehouse == "COMPUTE_WH"
+
+def test_size_is_read_from_the_exact_warehouse():
+    # "ETL_WH" is also a LIKE pattern matching ETLXWH
+    session = FakeSession(responses=[("show warehouses", [FakeRow(name="ETLXWH", size="Large"), FakeRow(name="ETL_WH", size="X-Small")])])
+    with stage_compute(session, "fact", POLICY):
+        pass
+    assert session.executed("warehouse_size = LARGE")
+
+def test_no_warehouse_anywhere():
+    session = FakeSession(warehouse=None)
+    with stage_compute(session, "upload", {"upload": {"after": "suspend"}}):
+        pass
+    assert session.statements == []
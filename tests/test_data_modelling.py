@@ -0,0 +1,63 @@
+import os
+import argparse
+import datetime
+import pytest
+
+pytest.importorskip("snowflake.snowpark")
+import data_modelling
+from data_modelling import _date_chunks, _positive_int, create_sales_fact_chunked, check_order_attr_mode, ORDER_ATTR_COLUMNS
+from surrogate_keys import hash_key_sql
+from fakes import FakeRow, FakeSession
+
+def d(value: str) -> datetime.date:
+    return datetime.date.fromisoformat(value)
+
+def test_date_chunks_cover_the_range():
+    # 2019-12-31 is 18261 days, a multiple of 3, after the epoch
+    assert _date_chunks("2020-01-01", "2020-01-07", 3) == [
+        (d("2019-12-31"), d("2020-01-02")),
+        (d("2020-01-03"), d("2020-01-05")),
+        (d("2020-01-06"), d("2020-01-08")),
+    ]
+
+def test_date_chunks_keep_their_boundaries_when_the_range_grows():
+    chunks = _date_chunks("2020-01-01", "2020-03-01", 7)
+    assert _date_chunks("2020-01-20", "2020-04-01", 7)[0] in chunks
+    assert _date_chunks("2020-02-28", "2020-03-01", 30) == [(d("2020-02-08"), d("2020-03-08"))]
+    assert _date_chunks("2020-01-02", "2020-01-01", 1) == []
+
+def test_date_chunks_reject_non_positive_size():
+    with pytest.raises(ValueError):
+        _date_chunks("2020-01-01", "2020-01-07", 0)
+    with pytest.raises(argparse.ArgumentTypeError):
+        _positive_int("-1")
+    assert _positive_int("7") == 7
+
+def test_chunked_fact_without_orders_replaces_nothing():
+    session = FakeSession(responses=[("min(min_order_dt)", [FakeRow(MIN_ORDER_DT=None, MAX_ORDER_DT=None)])])
+    assert create_sales_fact_chunked(session, None, 7) == (True, 0)
+    assert not session.executed("delete from")
+
+def _tables(table_type: str) -> FakeSession:
+    return FakeSession(responses=[("information_schema.tables", [FakeRow(TABLE_TYPE=table_type)])])
+
+@pytest.mark.parametrize("use_order_attr_dim, table_type, ok", [
+    (False, "BASE TABLE", True),
+    (True, "VIEW", True),
+    (False, "VIEW", False),
+    (True, "BASE TABLE", False),
+])
+def test_order_attr_mode_must_match_the_tables(monkeypatch, use_order_attr_dim, table_type, ok):
+    monkeypatch.setattr(data_modelling, "USE_ORDER_ATTR_DIM", use_order_attr_dim)
+    if ok:
+        check_order_attr_mode(_tables(table_type))
+    else:
+        with pytest.raises(RuntimeError):
+            check_order_attr_mode(_tables(table_type))
+
+def test_migration_keys_match_the_fact_keys():
+    # fact rows carried over by the migration must keep joining the rows later loads add
+    with open(os.path.join(os.path.dirname(data_modelling.__file__), "order_attr_dim_migration.sql")) as f:
+        migration = " ".join(f.read().split())
+    assert hash_key_sql(*ORDER_ATTR_COLUMNS) in migration
+    assert hash_key_sql("payment_method", "payment_provider", "country", "region") in migration
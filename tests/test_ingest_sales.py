@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("snowflake.snowpark")
+from ingest_sales import MAX_COPY_FILES, ingest_in_sales
+from fakes import FakeRow, FakeSession
+
+def test_copy_files_are_batched():
+    files = [f"date=2020-01-01/order-{i}.csv" for i in range(2 * MAX_COPY_FILES + 1)]
+    session = FakeSession(responses=[("order-2000.csv", [FakeRow(file="order-2000.csv", status="LOAD_FAILED")])])
+    assert not ingest_in_sales(session, files)
+    copies = session.executed("COPY INTO")
+    assert [q.count(".csv'") for q in copies] == [MAX_COPY_FILES, MAX_COPY_FILES, 1]
+
+def test_copy_without_files_scans_the_source_path():
+    session = FakeSession()
+    assert ingest_in_sales(session)
+    assert len(session.executed("COPY INTO")) == 1 and not session.executed("FILES =")
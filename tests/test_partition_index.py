@@ -0,0 +1,100 @@
+import os
+import json
+import pytest
+from partition_index import scan_csv, scan_json, scan_parquet, update_index, order_date_range, rows_by_source_date, fingerprint_file
+from surrogate_keys import hash_key
+
+CSV_HEADER = "Order ID,Customer Name,Order Amount,Order Date\n"
+
+def _write(directory, partition: str, name: str, text: str) -> str:
+    path = os.path.join(directory, partition, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+def test_scan_csv_counts_rows_per_date(tmp_path):
+    path = _write(tmp_path, "", "orders.csv", CSV_HEADER
+                  + 'A1,"Garde, Reyansh",10.5,2020-01-01\n'
+                  + 'A2,"Multi\nline",20,2020-01-02\n'
+                  + "A3,Asha,30,2020-01-02\n")
+    stats = scan_csv(path)
+    assert stats["row_count"] == 3
+    assert stats["rows_by_date"] == {"2020-01-01": 1, "2020-01-02": 2}
+    assert (stats["min_order_dt"], stats["max_order_dt"]) == ("2020-01-01", "2020-01-02")
+
+def test_scan_json_counts_rows_per_date(tmp_path):
+    records = [{"Order ID": "F1", "Order Date": "2020-01-03"}, {"Order ID": "F2", "Order Date": None}]
+    stats = scan_json(_write(tmp_path, "", "orders.json", json.dumps(records, indent=4)))
+    assert stats["row_count"] == 2
+    assert stats["rows_by_date"] == {"": 1, "2020-01-03": 1}
+    assert stats["min_order_dt"] == stats["max_order_dt"] == "2020-01-03"
+
+def test_schema_fingerprint_follows_columns(tmp_path):
+    same = scan_csv(_write(tmp_path, "", "a.csv", CSV_HEADER))
+    other = scan_csv(_write(tmp_path, "", "b.csv", "Order ID,Order Date\n"))
+    assert same["schema_fingerprint"] == scan_csv(_write(tmp_path, "", "c.csv", CSV_HEADER))["schema_fingerprint"]
+    assert same["schema_fingerprint"] != other["schema_fingerprint"]
+
+def test_scan_parquet_footer_and_multi_day(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    single_day = str(tmp_path / "single.parquet")
+    pq.write_table(pa.table({"Order ID": ["U1", "U2"], "Order Date": ["2020-01-04", "2020-01-04"]}), single_day)
+    assert scan_parquet(single_day)["rows_by_date"] == {"2020-01-04": 2}
+
+    multi_day = str(tmp_path / "multi.parquet")
+    pq.write_table(pa.table({"Order ID": ["U1", "U2", "U3"], "Order Date": ["2020-01-04", "2020-01-05", "2020-01-05"]}), multi_day)
+    assert scan_parquet(multi_day)["rows_by_date"] == {"2020-01-04": 1, "2020-01-05": 2}
+
+def test_update_index_rescans_only_changes(tmp_path):
+    sales, index_path = tmp_path / "sales", str(tmp_path / "index.json")
+    _write(sales, "source=IN/format=csv/date=2020-01-01", "a.csv", CSV_HEADER + "A1,X,1,2020-01-01\n")
+    gone = _write(sales, "source=IN/format=csv/date=2020-01-02", "b.csv", CSV_HEADER + "A2,X,1,2020-01-02\n")
+    _write(sales, "source=FR/format=json/date=2020-01-03", "c.json", json.dumps([{"Order Date": "2020-01-03"}]))
+
+    index = update_index(str(sales), index_path)
+    assert index["errors"] == []
+    assert order_date_range(index) == ("2020-01-01", "2020-01-03")
+    assert order_date_range(index, "FR") == ("2020-01-03", "2020-01-03")
+    assert rows_by_source_date(index) == {("IN", "2020-01-01"): 1, ("IN", "2020-01-02"): 1, ("FR", "2020-01-03"): 1}
+    assert index["files"]["source=IN/format=csv/date=2020-01-01/a.csv"]["partition_date"] == "2020-01-01"
+
+    mtime = os.path.getmtime(index_path)
+    assert update_index(str(sales), index_path)["files"] == index["files"]
+    # nothing changed, nothing written
+    assert os.path.getmtime(index_path) == mtime
+
+    os.remove(gone)
+    index = update_index(str(sales), index_path)
+    assert sorted(index["files"]) == ["source=FR/format=json/date=2020-01-03/c.json", "source=IN/format=csv/date=2020-01-01/a.csv"]
+
+def test_unreadable_file_is_reported(tmp_path):
+    sales = tmp_path / "sales"
+    _write(sales, "source=US/format=parquet/date=2020-01-01", "broken.parquet", "not parquet")
+    index = update_index(str(sales), str(tmp_path / "index.json"))
+    assert index["errors"] == ["source=US/format=parquet/date=2020-01-01/broken.parquet"]
+    assert index["files"] == {}
+
+def test_fingerprint_file_is_order_insensitive(tmp_path):
+    rows = ["A1,X,10.005,2020-01-01\n", "A2,X,20,2020-01-01\n", ",X,,2020-01-02\n"]
+    forward = fingerprint_file(_write(tmp_path, "", "forward.csv", CSV_HEADER + "".join(rows)))
+    backward = fingerprint_file(_write(tmp_path, "", "backward.csv", CSV_HEADER + "".join(reversed(rows))))
+    assert forward == backward
+    assert forward["2020-01-01"] == {"rows": 2, "id_hash_sum": hash_key("A1") + hash_key("A2"), "amount_sum": "30.01"}
+    # a missing order id hashes like the SQL coalesce to ''
+    assert forward["2020-01-02"] == {"rows": 1, "id_hash_sum": hash_key(""), "amount_sum": "0"}
+
+def test_fingerprint_json_matches_csv(tmp_path):
+    csv_path = _write(tmp_path, "", "orders.csv", CSV_HEADER + "A1,X,3054,2020-01-02\n")
+    json_path = _write(tmp_path, "", "orders.json",
+                       json.dumps([{"Order ID": "A1", "Order Amount": 3054, "Order Date": "2020-01-02"}]))
+    assert fingerprint_file(csv_path) == fingerprint_file(json_path)
+
+def test_update_index_caches_fingerprints(tmp_path):
+    sales, index_path = tmp_path / "sales", str(tmp_path / "index.json")
+    _write(sales, "source=IN/format=csv/date=2020-01-01", "a.csv", CSV_HEADER + "A1,X,1,2020-01-01\n")
+    assert "fingerprints" not in update_index(str(sales), index_path)["files"]["source=IN/format=csv/date=2020-01-01/a.csv"]
+    entry = update_index(str(sales), index_path, fingerprints=True)["files"]["source=IN/format=csv/date=2020-01-01/a.csv"]
+    assert entry["fingerprints"]["2020-01-01"]["rows"] == 1
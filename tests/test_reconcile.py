@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("snowflake.snowpark")
+from reconcile import _metrics, compare_layers, files_layer, partition_files_layer, loaded_layer, source_layers
+from fakes import FakeRow, FakeSession
+
+def test_matching_layers_reconcile():
+    layer = {("IN", "2020-01-01"): _metrics(2, 123, "30.50")}
+    assert compare_layers({"source_eligible": layer, "curated": dict(layer), "fact": dict(layer)}) == []
+
+def test_lost_row_is_reported_per_metric():
+    curated = {("IN", "2020-01-01"): _metrics(2, 123, "30.50")}
+    fact = {("IN", "2020-01-01"): _metrics(1, 100, "20.00")}
+    discrepancies = compare_layers({"curated": curated, "fact": fact})
+    assert [(d["upstream"], d["downstream"], d["metric"], d["expected"], d["actual"]) for d in discrepancies] == [
+        ("curated", "fact", "rows", "2", "1"),
+        ("curated", "fact", "id_hash_sum", "123", "100"),
+        ("curated", "fact", "amount_sum", "30.50", "20.00"),
+    ]
+
+def test_missing_day_and_row_count_only_check():
+    files = {("US", "2020-01-02"): _metrics(5, 999, "10")}
+    # COPY_HISTORY has row counts only, hash and amount differences are not compared
+    assert compare_layers({"files_in_window": files, "loaded": {("US", "2020-01-02"): _metrics(5, 0, 0)}}) == []
+    missing = compare_layers({"files_in_window": files, "loaded": {}})
+    assert [(d["source"], d["order_dt"], d["metric"]) for d in missing] == [("US", "2020-01-02", "rows")]
+
+def test_files_layer_sums_fingerprints_per_order_date():
+    index = {"files": {
+        "old.csv": {"source": "IN", "mtime": 100.0, "partition_date": "2020-01-01", "row_count": 1,
+                    "fingerprints": {"2020-01-01": {"rows": 1, "id_hash_sum": 5, "amount_sum": "1.10"}}},
+        "new.csv": {"source": "IN", "mtime": 200.0, "partition_date": "2020-01-03", "row_count": 2,
+                    "fingerprints": {"2020-01-01": {"rows": 2, "id_hash_sum": 7, "amount_sum": "2.20"}}},
+    }}
+    assert files_layer(index) == {("IN", "2020-01-01"): _metrics(3, 12, "3.30")}
+    # COPY_HISTORY is grouped by the date= partition the file landed in, not by order date
+    assert partition_files_layer(index) == {("IN", "2020-01-01"): _metrics(1, 0, 0), ("IN", "2020-01-03"): _metrics(2, 0, 0)}
+    assert partition_files_layer(index, landed_since=150.0) == {("IN", "2020-01-03"): _metrics(2, 0, 0)}
+
+def test_layer_queries_avoid_the_reserved_rows_alias():
+    session = FakeSession(responses=[
+        ("copy_history", [FakeRow(SOURCE="IN", ORDER_DT="2020-01-01", ROW_CNT=3)]),
+        ("eligible", [FakeRow(SOURCE="IN", ORDER_DT="2020-01-01", ROW_CNT=3, ID_HASH_SUM=9, AMOUNT_SUM="3.00",
+                              ELIGIBLE_ROW_CNT=2, ELIGIBLE_ID_HASH_SUM=6, ELIGIBLE_AMOUNT_SUM="2.00")]),
+    ])
+    assert loaded_layer(session, 14) == {("IN", "2020-01-01"): _metrics(3, 0, 0)}
+    source, eligible = source_layers(session)
+    assert source[("IN", "2020-01-01")]["rows"] == 3 and eligible[("IN", "2020-01-01")]["rows"] == 2
+    assert not session.executed(" as rows")
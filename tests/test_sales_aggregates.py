@@ -0,0 +1,44 @@
+import pytest
+from fakes import FakeRow, FakeSession
+from sales_aggregates import AGGREGATES, MEASURES, refresh_sales_aggregates, ensure_aggregate_streams
+
+def _streams(*names):
+    return ("show streams", [FakeRow(name=name.upper()) for name in names])
+
+ALL_STREAMS = _streams(*(agg["stream"] for agg in AGGREGATES.values()))
+
+def test_refresh_merges_the_stream_delta():
+    session = FakeSession(responses=[ALL_STREAMS])
+    assert refresh_sales_aggregates(session)
+    merges = session.executed("merge into")
+    assert len(merges) == len(AGGREGATES)
+    brand = next(q for q in merges if "sales_daily_brand_agg" in q)
+    assert "from sales_dwh.consumption.sales_fact_brand_agg_stream f" in brand
+    assert "on equal_null(t.order_dt, s.order_dt) and equal_null(t.country, s.country)" in brand
+    for measure in MEASURES:
+        assert f"t.{measure} = t.{measure} + s.{measure}" in brand
+    assert not session.executed("insert overwrite")
+
+def test_rebuild_reads_the_fact_as_of_the_new_stream():
+    session = FakeSession(responses=[ALL_STREAMS])
+    assert refresh_sales_aggregates(session, rebuild=True)
+    statements = session.statements
+    replace = statements.index(next(q for q in statements if "create or replace stream sales_dwh.consumption.sales_fact_payment_agg_stream" in q))
+    overwrite = statements.index(next(q for q in statements if "insert overwrite into sales_dwh.consumption.sales_daily_payment_agg" in q))
+    assert replace < overwrite
+    assert "sales_fact at(stream => 'sales_dwh.consumption.sales_fact_payment_agg_stream') f" in statements[overwrite]
+    assert not session.executed("merge into")
+
+def test_missing_stream_is_created_with_a_rebuild():
+    # the "like" pattern also matches other names, only the exact one counts
+    session = FakeSession(responses=[_streams("sales_fact_brand_agg_stream", "sales_factXpayment_agg_stream")])
+    ensure_aggregate_streams(session)
+    assert session.executed("create or replace stream sales_dwh.consumption.sales_fact_payment_agg_stream")
+    assert session.executed("insert overwrite into sales_dwh.consumption.sales_daily_payment_agg")
+    assert not session.executed("sales_daily_brand_agg")
+
+def test_failed_rebuild_drops_the_stream():
+    session = FakeSession(responses=[_streams()], fail_on=("insert overwrite",))
+    with pytest.raises(RuntimeError):
+        ensure_aggregate_streams(session)
+    assert session.executed("drop stream if exists sales_dwh.consumption.sales_fact_brand_agg_stream")
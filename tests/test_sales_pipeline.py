@@ -0,0 +1,56 @@
+import sys
+import json
+import types
+import pytest
+import sales_pipeline
+from partition_index import update_index
+from sales_pipeline import _parse_importtime, _save_state, run_incremental, curate
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       412 |       9012 | snowflake.snowpark
+import time:        80 |       2100 |   snowflake.connector
+import time:        15 |         15 |     snowflake.connector.errors
+Traceback (most recent call last):
+"""
+
+def test_parse_importtime():
+    assert list(_parse_importtime(IMPORTTIME)) == [
+        (120, 1, "_io"),
+        (9012, 0, "snowflake.snowpark"),
+        (2100, 1, "snowflake.connector"),
+        (15, 2, "snowflake.connector.errors"),
+    ]
+
+def _args(tmp_path) -> list:
+    return ["--directory", str(tmp_path / "sales"), "--index", str(tmp_path / "index.json"), "--state", str(tmp_path / "state.json")]
+
+def test_run_without_new_files_is_a_no_op(tmp_path):
+    partition = tmp_path / "sales" / "source=IN" / "format=csv" / "date=2020-01-01"
+    partition.mkdir(parents=True)
+    (partition / "a.csv").write_text("Order ID,Order Date\nA1,2020-01-01\n")
+
+    # build the index, then record its files as processed
+    index = update_index(str(tmp_path / "sales"), str(tmp_path / "index.json"))
+    _save_state({key: [e["size"], e["mtime"]] for key, e in index["files"].items()}, str(tmp_path / "state.json"))
+
+    sys.modules.pop("ingest_sales", None)
+    assert run_incremental(_args(tmp_path))
+    # the Snowflake modules are only imported when something landed
+    assert "ingest_sales" not in sys.modules
+    with open(tmp_path / "state.json") as f:
+        assert list(json.load(f)) == ["source=IN/format=csv/date=2020-01-01/a.csv"]
+
+def test_curate_defaults_to_every_source(monkeypatch):
+    curated = []
+    def import_module(name):
+        return types.SimpleNamespace(main=lambda: curated.append(name))
+    monkeypatch.setattr(sales_pipeline.importlib, "import_module", import_module)
+
+    assert curate([]) == []
+    assert curated == ["source_FR", "source_IN", "source_US"]
+    curated.clear()
+    assert curate(["US"]) == []
+    assert curated == ["source_US"]
+    with pytest.raises(SystemExit):
+        curate(["DE"])
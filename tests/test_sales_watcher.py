@@ -0,0 +1,123 @@
+import os
+import json
+import time
+from sales_watcher import LandedFile, MicroBatcher, LocalStage, SalesWatcher, parse_partition, scan_landed_files
+
+def _landed(name: str, size: int = 10) -> LandedFile:
+    return LandedFile(f"/landing/{name}", "source=IN/format=csv/date=2020-01-01", name, "IN", "csv", size)
+
+def _write(directory, partition: str, name: str, text: str = "Order ID\n1\n") -> str:
+    path = os.path.join(directory, partition, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+def test_parse_partition():
+    assert parse_partition("source=US/format=parquet/date=2020-01-02") == {"source": "US", "format": "parquet", "date": "2020-01-02"}
+
+def test_batch_cut_on_file_count():
+    batcher = MicroBatcher(max_files=2, max_bytes=10**9, max_wait=3600)
+    batcher.add([_landed("a.csv")])
+    assert not batcher.due()
+    batcher.add([_landed("b.csv"), _landed("c.csv")])
+    assert batcher.due()
+    assert [f.file_name for f in batcher.take()] == ["a.csv", "b.csv"]
+    assert [f.file_name for f in batcher.pending] == ["c.csv"]
+    assert batcher.pending_bytes == 10
+
+def test_batch_cut_on_bytes():
+    batcher = MicroBatcher(max_files=100, max_bytes=25, max_wait=3600)
+    batcher.add([_landed("a.csv", 10), _landed("b.csv", 10)])
+    assert not batcher.due()
+    batcher.add([_landed("c.csv", 10)])
+    assert batcher.due()
+
+def test_batch_cut_on_age():
+    batcher = MicroBatcher(max_files=100, max_bytes=10**9, max_wait=0.05)
+    assert not batcher.due()
+    batcher.add([_landed("a.csv")])
+    assert not batcher.due()
+    time.sleep(0.06)
+    assert batcher.due()
+    batcher.take()
+    assert batcher.first_arrival is None and not batcher.due()
+
+def test_scan_waits_for_stable_size(tmp_path):
+    path = _write(tmp_path, "source=IN/format=csv/date=2020-01-01", "order.csv")
+    seen, last_sizes = set(), {}
+    assert scan_landed_files(str(tmp_path), seen, last_sizes) == []
+    # still being written
+    with open(path, "a") as f:
+        f.write("2\n")
+    assert scan_landed_files(str(tmp_path), seen, last_sizes) == []
+    ready = scan_landed_files(str(tmp_path), seen, last_sizes)
+    assert [(f.source, f.file_type, f.file_name) for f in ready] == [("IN", "csv", "order.csv")]
+
+def test_scan_skips_seen_and_foreign_files(tmp_path):
+    seen_path = _write(tmp_path, "source=IN/format=csv/date=2020-01-01", "seen.csv")
+    _write(tmp_path, "source=IN/format=csv/date=2020-01-01", "notes.txt")
+    _write(tmp_path, "source=US/format=csv/date=2020-01-01", "wrong_format.csv")
+    seen, last_sizes = {os.path.abspath(seen_path)}, {}
+    scan_landed_files(str(tmp_path), seen, last_sizes)
+    assert scan_landed_files(str(tmp_path), seen, last_sizes) == []
+
+def test_local_stage_end_to_end(tmp_path):
+    landing, stage_root = tmp_path / "sales", tmp_path / "stage"
+    _write(landing, "source=IN/format=csv/date=2020-01-01", "order-20200101.csv")
+    _write(landing, "source=FR/format=json/date=2020-01-02", "order-20200102.json", "[]")
+
+    watcher = SalesWatcher(str(landing), LocalStage(str(stage_root)), MicroBatcher(50, 10**9, 3600))
+    watcher.run(once=True)
+
+    assert (stage_root / "csv/sales/source=IN/format=csv/date=2020-01-01/order-20200101.csv").exists()
+    assert (stage_root / "json/sales/source=FR/format=json/date=2020-01-02/order-20200102.json").exists()
+    with open(stage_root / "_copy_log.jsonl") as f:
+        copies = {entry["source"]: entry["files"] for entry in map(json.loads, f)}
+    assert copies == {"FR": ["date=2020-01-02/order-20200102.json"], "IN": ["date=2020-01-01/order-20200101.csv"]}
+
+class FailingStage(LocalStage):
+    def copy(self, source: str, files: list) -> None:
+        raise RuntimeError("COPY failed")
+
+def test_failed_batch_is_rescanned(tmp_path):
+    landing = tmp_path / "sales"
+    path = _write(landing, "source=IN/format=csv/date=2020-01-01", "order.csv")
+    watcher = SalesWatcher(str(landing), FailingStage(str(tmp_path / "stage")), MicroBatcher(50, 10**9, 3600))
+    watcher.run(once=True)
+    assert os.path.abspath(path) not in watcher.seen
+
+    watcher.stage = LocalStage(str(tmp_path / "stage"))
+    watcher.run(once=True)
+    assert os.path.abspath(path) in watcher.seen
+    assert (tmp_path / "stage" / "_copy_log.jsonl").exists()
+
+def test_existing_files_are_loaded_once_across_restarts(tmp_path):
+    landing, stage_root, state = tmp_path / "sales", tmp_path / "stage", str(tmp_path / "state.json")
+    _write(landing, "source=IN/format=csv/date=2020-01-01", "order.csv")
+
+    SalesWatcher(str(landing), LocalStage(str(stage_root)), MicroBatcher(50, 10**9, 3600), state_path=state).run(once=True)
+    restarted = SalesWatcher(str(landing), LocalStage(str(stage_root)), MicroBatcher(50, 10**9, 3600), state_path=state)
+    restarted.run(once=True)
+
+    with open(stage_root / "_copy_log.jsonl") as f:
+        assert len(f.readlines()) == 1
+
+def test_skip_existing(tmp_path):
+    landing, stage_root = tmp_path / "sales", tmp_path / "stage"
+    _write(landing, "source=IN/format=csv/date=2020-01-01", "order.csv")
+    watcher = SalesWatcher(str(landing), LocalStage(str(stage_root)), MicroBatcher(50, 10**9, 3600))
+    watcher.mark_existing()
+    watcher.run(once=True)
+    assert not (stage_root / "_copy_log.jsonl").exists()
+
+def test_removed_files_are_forgotten(tmp_path):
+    landing = tmp_path / "sales"
+    path = _write(landing, "source=IN/format=csv/date=2020-01-01", "order.csv")
+    watcher = SalesWatcher(str(landing), LocalStage(str(tmp_path / "stage")), MicroBatcher(50, 10**9, 3600))
+    watcher.run(once=True)
+    assert watcher.loaded == {os.path.abspath(path)}
+
+    os.remove(path)
+    watcher.poll()
+    assert watcher.seen == set() and watcher.loaded == set() and watcher.last_sizes == {}
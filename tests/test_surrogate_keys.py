@@ -0,0 +1,23 @@
+from surrogate_keys import natural_key, hash_key, hash_key_sql, date_key, date_key_sql
+
+def test_hash_key_matches_md5_number_lower64():
+    # SELECT MD5_NUMBER_LOWER64('Snowflake') returns 9203306159527282910
+    assert hash_key("Snowflake") == 9203306159527282910
+
+def test_hash_key_is_unsigned_64_bit():
+    for values in [("",), ("IN", "APAC"), ("Apple/iPhone 11/Black/4GB/64 GB",)]:
+        assert 0 <= hash_key(*values) < 2 ** 64
+
+def test_natural_key_like_the_sql_concat():
+    # coalesce(to_varchar(col), '') joined by concat_ws('|', ...)
+    assert natural_key("Debit Card", None, "FR", 1) == "Debit Card||FR|1"
+    assert hash_key(None) == hash_key("")
+    assert hash_key("a", "b") != hash_key("b", "a")
+
+def test_hash_key_sql():
+    assert hash_key_sql("country", "region") == \
+        "md5_number_lower64(concat_ws('|', coalesce(to_varchar(country), ''), coalesce(to_varchar(region), '')))"
+
+def test_date_key():
+    assert date_key("2020-01-02") == 20200102
+    assert date_key_sql("order_dt") == "to_number(to_char(to_date(order_dt), 'YYYYMMDD'))"
@@ -2,6 +2,7 @@ import os
 from snowflake.snowpark import Session
 import sys
 import logging
+from compute_policy import stage_compute
 
 # Setup logging
 logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%I:%M:%S')
@@ -40,8 +41,9 @@ def traverse_directory(directory: str, file_extension: str):
     return file_names, partition_dirs, local_paths
 
 # Upload files to Snowflake stage
-def upload_files(file_names, partition_dirs, local_paths, stage_location, file_type):
-    session = get_snowpark_session()
+def upload_files(file_names, partition_dirs, local_paths, stage_location, file_type, session=None):
+    # callers uploading repeatedly (e.g. watch mode) pass their own session
+    session = session or get_snowpark_session()
     for i, file in enumerate(file_names):
         full_stage_path = f"{stage_location}/{file_type}/{partition_dirs[i]}"
         logging.info(f"Uploading {file} to {full_stage_path}")
@@ -59,10 +61,15 @@ def main():
     base_path = "data/sales"
     stage_location = "@sales_dwh.source.my_internal_stg"
 
-    for ext in ['.csv', '.parquet', '.json']:
-        names, dirs, paths = traverse_directory(base_path, ext)
-        file_type = ext.replace('.', '')  # csv, parquet, json
-        upload_files(names, dirs, paths, stage_location, file_type)
+    session = get_snowpark_session()
+    try:
+        with stage_compute(session, "upload"):
+            for ext in ['.csv', '.parquet', '.json']:
+                names, dirs, paths = traverse_directory(base_path, ext)
+                file_type = ext.replace('.', '')  # csv, parquet, json
+                upload_files(names, dirs, paths, stage_location, file_type, session=session)
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     main()